@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts import presence
+
+
+class Command(BaseCommand):
+    help = 'Write buffered user activity to CustomUser.last_activity (run from cron on idle or serverless deployments)'
+
+    def handle(self, *args, **options):
+        flushed = presence.flush()
+        self.stdout.write(self.style.SUCCESS(f'Flushed last activity of {flushed} user(s).'))
@@ -1,12 +1,32 @@
-from django.utils import timezone
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from . import presence
+
+class PresenceMiddleware:
+    """Record activity of authenticated users; see accounts.presence."""
+
+    sync_capable = True
+    async_capable = True
 
-class UpdateLastActivityMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
         response = self.get_response(request)
-        if request.user.is_authenticated:
-            request.user.last_activity = timezone.now()
-            request.user.save(update_fields=['last_activity'])
+        self._touch(request)
         return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        # Loading request.user and flushing the buffer both hit the database.
+        await sync_to_async(self._touch)(request)
+        return response
+
+    def _touch(self, request):
+        if request.user.is_authenticated:
+            presence.touch(request.user)
@@ -21,17 +21,32 @@ class CustomUser(AbstractUser):
         ('expert', 'Expert')
     ], blank=True, null=True)
 
+    def participation_history(self, start=None, end=None):
+        """
+        The user's participations, newest first, as dicts with the match and
+        its chat group joined in: one query however many rows there are.
+        ``start`` / ``end`` limit the join date (inclusive).
+        """
+        rows = self.participations.order_by("-created_at", "-id")
+        if start:
+            rows = rows.filter(created_at__date__gte=start)
+        if end:
+            rows = rows.filter(created_at__date__lte=end)
+        return rows.values(
+            "id",
+            "created_at",
+            "match_id",
+            group_id=models.F("match__group__id"),
+            match_title=models.F("match__title"),
+            event_date=models.F("match__event_date"),
+        )
+
     @property
     def participation(self):
-        participations = self.participations.all()
-        data = []
-        for participation in participations:
-            data.append({
-                "match": participation.match.id,
-                "group": participation.match.group.id,
-                "created_at":participation.created_at
-            })
-        return data
+        return [
+            {"match": row["match_id"], "group": row["group_id"], "created_at": row["created_at"]}
+            for row in self.participation_history()
+        ]
     
     last_activity = models.DateTimeField(null=True, blank=True)
 
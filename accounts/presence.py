@@ -0,0 +1,156 @@
+"""
+Write-coalescing presence tracker backing ``CustomUser.last_activity``.
+
+``touch(user)`` is called for every authenticated request, but a user is
+recorded at most once per PRESENCE_THROTTLE seconds. A recorded hit
+
+- adds the user to per-minute and per-day sets in the cache, which
+  ``online_count()`` and ``active_today_count()`` read, and
+- is buffered in the cache and written to ``last_activity`` with one bulk
+  UPDATE by ``flush()``.
+
+``flush()`` runs from the request that finds PRESENCE_FLUSH_INTERVAL seconds
+have passed since this process last flushed, when a server process exits
+(``flush_on_exit()``, called from the WSGI and ASGI entry points), and from
+the ``flush_presence`` command, which a cron job can run so an idle or frozen
+deployment still gets its writes out. The buffer lives in the cache so any
+process sharing it can flush what another one recorded.
+
+The sets and the buffer are read-modify-written, so with a cache shared by
+several workers a concurrent hit can occasionally be dropped; the user is
+simply recorded again once their throttle expires.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+DAY_TIMEOUT = 2 * 24 * 60 * 60
+PENDING_KEY = "presence:pending"
+
+_bucket_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _minute_key(moment):
+    return f"presence:minute:{moment:%Y%m%d%H%M}"
+
+
+def _day_key(day):
+    return f"presence:day:{day:%Y%m%d}"
+
+
+def _day_members(day):
+    """Usernames active on ``day``, seeded from the database if the cache lost them."""
+    members = cache.get(_day_key(day))
+    if members is None:
+        members = set(
+            CustomUser.objects.filter(last_activity__date=day).values_list("pk", flat=True)
+        )
+        cache.add(_day_key(day), members, timeout=DAY_TIMEOUT)
+    return members
+
+
+def _pending():
+    """Buffered ``{username: last seen}`` not yet written to the database."""
+    return cache.get(PENDING_KEY) or {}
+
+
+def _record(username, now):
+    online_window = _setting("PRESENCE_ONLINE_WINDOW", 10)
+    day = timezone.localdate(now)
+    with _bucket_lock:
+        pending = _pending()
+        pending[username] = now
+        cache.set(PENDING_KEY, pending, timeout=DAY_TIMEOUT)
+
+        minute_key = _minute_key(now)
+        minute = cache.get(minute_key, set())
+        minute.add(username)
+        cache.set(minute_key, minute, timeout=(online_window + 1) * 60)
+
+        # Only extend a day set that already exists; a missing one is seeded
+        # from the database on the next read, which keeps touch() query-free.
+        members = cache.get(_day_key(day))
+        if members is not None:
+            members.add(username)
+            cache.set(_day_key(day), members, timeout=DAY_TIMEOUT)
+
+
+def touch(user):
+    """Note that ``user`` is active now. Cheap to call on every request."""
+    throttle = _setting("PRESENCE_THROTTLE", 60)
+    if not cache.add(f"presence:seen:{user.pk}", True, timeout=throttle):
+        return
+
+    _record(user.pk, timezone.now())
+    if time.monotonic() - _last_flush >= _setting("PRESENCE_FLUSH_INTERVAL", 60):
+        flush()
+
+
+def flush():
+    """Write buffered activity to ``last_activity`` in one bulk statement."""
+    global _last_flush
+    with _bucket_lock:
+        pending = _pending()
+        cache.delete(PENDING_KEY)
+        _last_flush = time.monotonic()
+    if not pending:
+        return 0
+
+    users = [CustomUser(pk=username, last_activity=seen) for username, seen in pending.items()]
+    CustomUser.objects.bulk_update(users, ["last_activity"], batch_size=500)
+    return len(users)
+
+
+def _flush_quietly():
+    try:
+        flush()
+    except DatabaseError:
+        logger.exception("Could not flush presence on exit")
+
+
+def flush_on_exit():
+    """Flush buffered activity when this server process exits, e.g. a recycled worker."""
+    atexit.register(_flush_quietly)
+
+
+def online_count(now=None):
+    """Users seen within the last PRESENCE_ONLINE_WINDOW minutes."""
+    now = now or timezone.now()
+    window = _setting("PRESENCE_ONLINE_WINDOW", 10)
+    keys = [_minute_key(now - timedelta(minutes=offset)) for offset in range(window + 1)]
+    online = set()
+    for members in cache.get_many(keys).values():
+        online |= members
+    return len(online)
+
+
+def active_today_count(now=None):
+    day = timezone.localdate(now or timezone.now())
+    members = _day_members(day)
+    # Activity recorded before the day set was seeded may not be flushed yet.
+    members |= {username for username, seen in _pending().items() if timezone.localdate(seen) == day}
+    return len(members)
+
+
+def reset():
+    """Drop buffered activity without writing it. Meant for tests."""
+    global _last_flush
+    with _bucket_lock:
+        cache.delete(PENDING_KEY)
+        _last_flush = time.monotonic()
@@ -1,8 +1,18 @@
 import json
-from django.test import TestCase, Client
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from accounts import presence
 from accounts.models import CustomUser
+from liveChat.models import Group
+from matches.models import Match, Participation, SportCategory
 
 
 class AccountsViewsTest(TestCase):
@@ -146,9 +156,155 @@ class AccountsViewsTest(TestCase):
         response = self.client.get(reverse("accounts:ajax_all_users"))
         self.assertEqual(response.status_code, 200)
 
-        data = json.loads(response.content)
+        data = json.loads(b"".join(response.streaming_content))
         self.assertIn("users", data)
         self.assertIn("admins", data)
         self.assertIsInstance(data["users"], list)
         self.assertIsInstance(data["admins"], list)
+        self.assertIn("adminuser", [admin["pk"] for admin in data["admins"]])
+        self.assertNotIn("password", data["admins"][0]["fields"])
+
+
+
+class ParticipationHistoryTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="player", password="password123")
+        category = SportCategory.objects.create(name="Futsal")
+        base = timezone.now() - timedelta(days=10)
+        self.participations = []
+        for i in range(12):
+            match = Match.objects.create(
+                title=f"Futsal {i}",
+                category=category,
+                location="Depok",
+                event_date=timezone.now() + timedelta(days=i),
+                max_members=10,
+            )
+            if i % 4:
+                Group.objects.create(match=match, name=f"Group {match.title}")
+            participation = Participation.objects.create(match=match, user=self.user)
+            # Two per day, so date filters and equal timestamps are both exercised.
+            Participation.objects.filter(pk=participation.pk).update(created_at=base + timedelta(days=i // 2))
+            self.participations.append(participation)
+        self.client.login(username="player", password="password123")
+        self.url = reverse("accounts:profile_history")
+
+    def test_participation_property_is_one_query(self):
+        with self.assertNumQueries(1):
+            history = self.user.participation
+        self.assertEqual(len(history), 12)
+        latest = self.participations[-1]
+        self.assertEqual(history[0]["match"], latest.match_id)
+        self.assertEqual(history[0]["group"], latest.match.group.id)
+        self.assertIsNone(history[-1]["group"])  # match without a chat group
+
+    def test_history_pages_walk_every_participation_once(self):
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 5}
+            if cursor:
+                params["cursor"] = cursor
+            body = self.client.get(self.url, params).json()
+            seen.extend(row["match"] for row in body["data"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+        expected = [str(match_id) for match_id in self.user.participations.order_by("-created_at", "-id").values_list("match_id", flat=True)]
+        self.assertEqual(seen, expected)
+
+    @override_settings(PRESENCE_FLUSH_INTERVAL=3600)
+    def test_history_page_query_count_is_constant(self):
+        # session, user, one page of participations with match and group
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.json()["data"]), 12)
+
+    def test_history_filters_by_date(self):
+        start = (timezone.now() - timedelta(days=9)).date()
+        end = (timezone.now() - timedelta(days=8)).date()
+        body = self.client.get(self.url, {"start": start.isoformat(), "end": end.isoformat()}).json()
+        self.assertEqual(
+            {row["match_title"] for row in body["data"]},
+            {"Futsal 2", "Futsal 3", "Futsal 4", "Futsal 5"},
+        )
+
+    def test_history_rejects_invalid_parameters(self):
+        for params in ({"start": "kemarin"}, {"limit": "banyak"}, {"cursor": "bukan-cursor"}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+class PresenceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        presence.reset()
+        self.user = CustomUser.objects.create_user(username="active", password="password123")
+        self.other = CustomUser.objects.create_user(username="idle", password="password123")
+
+    def test_touch_defers_last_activity_write(self):
+        with self.assertNumQueries(0):
+            presence.touch(self.user)
+            presence.touch(self.user)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_activity)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(presence.flush(), 1)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_activity)
+
+    def test_flush_updates_many_users_in_one_statement(self):
+        users = [CustomUser(username=f"bulk{i}") for i in range(20)]
+        CustomUser.objects.bulk_create(users)
+        for user in users:
+            presence.touch(user)
+        with self.assertNumQueries(1):
+            self.assertEqual(presence.flush(), 20)
+        self.assertEqual(CustomUser.objects.filter(last_activity__isnull=False).count(), 20)
+
+    def test_touch_is_throttled_per_user(self):
+        presence.touch(self.user)
+        presence.flush()
+        presence.touch(self.user)
+        self.assertEqual(presence.flush(), 0)
+
+    def test_online_and_active_today_counts(self):
+        # "idle" was only flushed to the database, e.g. before a cache restart.
+        now = timezone.now()
+        CustomUser.objects.filter(pk=self.other.pk).update(last_activity=now)
+        presence.touch(self.user)
+        self.assertEqual(presence.online_count(), 1)
+        self.assertEqual(presence.active_today_count(now), 2)
+        self.assertEqual(presence.online_count(now + timedelta(minutes=30)), 0)
+
+    def test_flush_presence_command_writes_the_shared_buffer(self):
+        presence.touch(self.user)
+        out = StringIO()
+        call_command("flush_presence", stdout=out)
+        self.assertIn("1 user(s)", out.getvalue())
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_activity)
+        self.assertEqual(presence.flush(), 0)
+
+    def test_flush_on_exit_registers_a_quiet_flush(self):
+        with mock.patch("accounts.presence.atexit.register") as register:
+            presence.flush_on_exit()
+        register.assert_called_once_with(presence._flush_quietly)
+
+        presence.touch(self.user)
+        with mock.patch("accounts.presence.flush", side_effect=DatabaseError):
+            with self.assertLogs("accounts.presence", level="ERROR"):
+                presence._flush_quietly()
+
+    @override_settings(PRESENCE_FLUSH_INTERVAL=0)
+    def test_middleware_flushes_when_interval_elapsed(self):
+        self.client.login(username="active", password="password123")
+        self.client.get(reverse("accounts:profile_detail"))
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_activity)
 
+    @override_settings(PRESENCE_FLUSH_INTERVAL=0)
+    async def test_middleware_records_async_requests(self):
+        await self.async_client.aforce_login(self.user)
+        await self.async_client.get(reverse("accounts:profile_detail"))
+        await self.user.arefresh_from_db()
+        self.assertIsNotNone(self.user.last_activity)
@@ -16,6 +16,7 @@ urlpatterns = [
     path('ajax/delete-user/<int:user_id>/', admin_delete_user, name='admin_delete_user'),
     path('ajax/users/', ajax_all_users, name='ajax_all_users'),
     path('ajax/profile/', profile, name='profile'),
+    path('ajax/profile/history/', profile_history, name='profile_history'),
     path("profile-detail/", profile_detail, name="profile_detail"),
     path('ajax/update_profile/', update_profile, name='update_profile'),
 ]
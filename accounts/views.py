@@ -6,11 +6,16 @@ from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404
 from django.forms.models import model_to_dict
-from django.core import serializers
+from django.utils.dateparse import parse_date
+from sosmed_PBPF08 import pagination, streaming
 from .models import CustomUser
 from .forms import RegisterForm
 
 
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+
+
 def login_page(request):
     return render(request, 'accounts/login.html')
 
@@ -79,12 +84,12 @@ def dashboard(request: HttpRequest):
 def ajax_all_users(request: HttpRequest):
     if request.user.role != 'admin':
         return HttpResponse(status=401)
-    users = serializers.serialize("json", CustomUser.objects.filter(role='user'))
-    admins = serializers.serialize("json", CustomUser.objects.filter(role='admin'))
-    return JsonResponse({
-        "users": json.loads(users),
-        "admins": json.loads(admins)
-    }, status=200)
+    # Streamed so the whole user table is never held in memory; password
+    # hashes stay out of the export.
+    return streaming.stream_json(request, {
+        "users": CustomUser.objects.filter(role='user'),
+        "admins": CustomUser.objects.filter(role='admin'),
+    }, exclude=("password",))
 
 @require_GET
 def profile(request: HttpRequest):
@@ -96,6 +101,58 @@ def profile(request: HttpRequest):
     print(data)
     return JsonResponse({"data": data}, status=200)
 
+def _date_param(request, name):
+    """YYYY-MM-DD from the query string: (date or None, is_valid)."""
+    value = request.GET.get(name)
+    if not value:
+        return None, True
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        return None, False
+    return parsed, parsed is not None
+
+
+@require_GET
+@login_required
+def profile_history(request: HttpRequest):
+    """
+    The logged in user's match history, newest first, one page at a time.
+
+    ``?start=`` / ``?end=`` (YYYY-MM-DD) limit the join date, ``?limit=`` is
+    the page size (capped at HISTORY_MAX_PAGE_SIZE) and ``?cursor=`` the
+    ``next_cursor`` of the previous page.
+    """
+    start, start_valid = _date_param(request, 'start')
+    end, end_valid = _date_param(request, 'end')
+    try:
+        limit = min(max(int(request.GET.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = None
+    cursor = request.GET.get('cursor')
+    position = pagination.decode_cursor(cursor, pagination.timestamp, int) if cursor else None
+    if not (start_valid and end_valid) or limit is None or (cursor and position is None):
+        return JsonResponse({'success': False, 'message': 'Parameter start, end, limit atau cursor tidak valid'}, status=400)
+
+    rows = request.user.participation_history(start=start, end=end)
+    if position:
+        rows = rows.filter(pagination.after(('-created_at', '-id'), position))
+    rows, next_cursor = pagination.page(rows, limit, lambda row: (row['created_at'], row['id']))
+
+    return JsonResponse({
+        "data": [
+            {
+                "match": row["match_id"],
+                "match_title": row["match_title"],
+                "event_date": row["event_date"],
+                "group": row["group_id"],
+                "created_at": row["created_at"],
+            }
+            for row in rows
+        ],
+        "next_cursor": next_cursor,
+    }, status=200)
+
 @login_required
 def admin_delete_user(request, user_id):
     if request.user.role != 'admin':
@@ -0,0 +1,189 @@
+"""
+User journeys replayed by the benchmark command.
+
+Each journey is a short sequence of requests a real user makes, sent through
+the Django test client as one of a pool of seeded users, so the whole stack
+(middleware, sessions, views, templates) is measured but no server or
+network is. ``run()`` times every request and counts its queries, and
+returns a report per journey:
+
+    {"requests", "errors", "latency_ms": {"p50", "p95", "p99", "mean", "max"},
+     "throughput_rps", "queries": {"mean", "max"}}
+
+``errors`` counts 5xx responses; 4xx answers (a full match, an already
+liked thread) are normal outcomes of the replay and are not errors.
+"""
+import math
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import F
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from booking_venue.models import Venue
+from liveChat.models import Group
+from matches.models import Match, SportCategory
+from threads.models import Thread
+
+from .seed import TAGS, USERNAME_PREFIX
+
+CLIENT_POOL_SIZE = 8
+HOT_THREADS = 10
+XHR = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+class Bench:
+    """A pool of logged-in clients plus the per-journey samples they record."""
+
+    def __init__(self, rng, pool_size=CLIENT_POOL_SIZE):
+        self.rng = rng
+        self.samples = defaultdict(list)
+        users = list(
+            CustomUser.objects.filter(username__startswith=USERNAME_PREFIX, participations__isnull=False)
+            .distinct().order_by("username")[:pool_size]
+        )
+        if not users:
+            raise ValueError("No seeded users with participations; run the seed first.")
+        self.clients = []
+        for user in users:
+            client = Client(raise_request_exception=False)
+            client.force_login(user)
+            self.clients.append((user, client))
+
+    def pick(self):
+        return self.rng.choice(self.clients)
+
+    def request(self, journey, client, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, **kwargs)
+            elapsed = time.perf_counter() - started
+        self.samples[journey].append((elapsed * 1000, len(queries), response.status_code))
+        return response
+
+
+def feed_load(bench, journey):
+    """Open the feed, scroll one page, then open the replies of a thread."""
+    _, client = bench.pick()
+    response = bench.request(journey, client, "get", reverse("threads:show_feed_json"))
+    page = response.json()
+    if page.get("next_cursor"):
+        bench.request(journey, client, "get", reverse("threads:show_feed_json"), data={"cursor": page["next_cursor"]})
+    if page.get("data"):
+        thread = bench.rng.choice(page["data"])
+        bench.request(journey, client, "get", reverse("threads:get_replies_page", args=[thread["id"]]))
+    bench.request(journey, client, "get", reverse("threads:trending_tags_json"))
+
+
+def like_storm(bench, journey):
+    """Every client toggles its like on the most liked threads at once."""
+    hot = list(Thread.objects.order_by("-likeCount", "-created_at").values_list("id", flat=True)[:HOT_THREADS])
+    for _, client in bench.clients:
+        bench.request(journey, client, "post", reverse("threads:like_thread_ajax", args=[bench.rng.choice(hot)]))
+
+
+def chat_polling(bench, journey):
+    """Open a group chat, then poll it for newer messages a few times."""
+    user, client = bench.pick()
+    group_ids = list(Group.objects.filter(match__participations__user=user).values_list("id", flat=True))
+    url = reverse("liveChat:operate_chat_by_group", args=[bench.rng.choice(group_ids)])
+    chats = bench.request(journey, client, "get", url, data={"limit": 50}).json()["data"]
+    since = chats[0]["createdAt"] if chats else (timezone.now() - timedelta(days=1)).isoformat()
+    for _ in range(3):
+        bench.request(journey, client, "get", url, data={"since": since})
+
+
+def dashboard_filter(bench, journey):
+    """Load the dashboard, then refine it by sport, date and keyword over XHR."""
+    _, client = bench.pick()
+    bench.request(journey, client, "get", reverse("matches:dashboard"))
+    slug = bench.rng.choice(list(SportCategory.objects.values_list("slug", flat=True)))
+    for params in (
+        {"sport": slug},
+        {"sport": slug, "when": bench.rng.choice(["today", "week", "month"])},
+        {"keyword": bench.rng.choice(TAGS), "available_only": "on"},
+    ):
+        bench.request(journey, client, "get", reverse("matches:dashboard"), data=params, **XHR)
+
+
+def venue_browse(bench, journey):
+    """Browse venues by region, then check one venue's free slots."""
+    _, client = bench.pick()
+    venue = bench.rng.choice(list(Venue.objects.values("id", "country")))
+    bench.request(journey, client, "get", reverse("booking_venue:main_page"), data={"region": venue["country"]})
+    bench.request(journey, client, "get", reverse("booking_venue:api_venues"))
+    bench.request(journey, client, "get", reverse("booking_venue:api_venue_availability", args=[venue["id"]]))
+
+
+def match_join(bench, journey):
+    """Search for an open match and join it."""
+    user, client = bench.pick()
+    bench.request(journey, client, "get", reverse("matches:search_match"), data={"q": bench.rng.choice(TAGS)})
+    open_matches = list(
+        Match.objects.exclude(participations__user=user)
+        .filter(participant_count__lt=F("max_members")).order_by("event_date").values_list("id", flat=True)[:20]
+    )
+    if open_matches:
+        match_id = bench.rng.choice(open_matches)
+        bench.request(journey, client, "post", reverse("matches:book_match", args=[match_id]), data={"message": "ikut"})
+
+
+JOURNEYS = {
+    "feed_load": feed_load,
+    "like_storm": like_storm,
+    "chat_polling": chat_polling,
+    "dashboard_filter": dashboard_filter,
+    "venue_browse": venue_browse,
+    "match_join": match_join,
+}
+
+
+def _summary(samples, elapsed):
+    latencies = sorted(sample[0] for sample in samples)
+    queries = [sample[1] for sample in samples]
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if sample[2] >= 500),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "max": round(latencies[-1], 3),
+        },
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+        "queries": {"mean": round(sum(queries) / len(queries), 2), "max": max(queries)},
+    }
+
+
+def run(names=None, iterations=50, seed=0):
+    """Replay each named journey ``iterations`` times and return the report per journey."""
+    names = names or list(JOURNEYS)
+    unknown = set(names) - set(JOURNEYS)
+    if unknown:
+        raise ValueError(f"Unknown journey(s): {', '.join(sorted(unknown))}")
+
+    bench = Bench(random.Random(seed))
+    report = {}
+    for name in names:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            JOURNEYS[name](bench, name)
+        elapsed = time.perf_counter() - started
+        if bench.samples[name]:
+            report[name] = _summary(bench.samples[name], elapsed)
+    return report
@@ -0,0 +1,80 @@
+import json
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+
+from benchmarks import journeys, seed
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway test database with synthetic data, replay user journeys against it and '
+        'print p50/p95/p99 latency, throughput and query counts per journey as JSON. '
+        'Runs on the configured database backend (PRODUCTION=true selects PostgreSQL); '
+        'the real database is never touched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help=f'Dataset size multiplier (default: 1.0 = {seed.BASE_COUNTS["users"]} users)')
+        parser.add_argument('--iterations', type=int, default=50, help='Runs of each journey (default: 50)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for data and journeys (default: 0)')
+        parser.add_argument('--journey', action='append', choices=list(journeys.JOURNEYS),
+                            help='Journey to run; repeat for several (default: all)')
+        parser.add_argument('--output', help='Write the report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        if options['scale'] <= 0:
+            raise CommandError('--scale must be positive.')
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1.')
+
+        verbosity = options['verbosity']
+        setup_test_environment()
+        old_config = setup_databases(verbosity, interactive=False, aliases={'default'}, serialized_aliases=set())
+        try:
+            started = time.perf_counter()
+            rows = seed.seed(scale=options['scale'], seed=options['seed'])
+            seed_seconds = time.perf_counter() - started
+            if verbosity > 1:
+                self.stderr.write(f'Seeded {sum(rows.values())} row(s) in {seed_seconds:.1f}s')
+            results = journeys.run(options['journey'], iterations=options['iterations'], seed=options['seed'])
+            vendor = connection.vendor
+        finally:
+            teardown_databases(old_config, verbosity)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'commit': _git_commit(),
+                'timestamp': timezone.now().isoformat(),
+                'database': vendor,
+                'scale': options['scale'],
+                'iterations': options['iterations'],
+                'seed': options['seed'],
+                'rows': rows,
+                'seed_seconds': round(seed_seconds, 2),
+            },
+            'journeys': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,64 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import CustomUser
+from benchmarks import seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-generate synthetic users, venues with bookings, matches with participations and chat '
+        'groups, and threads with Zipf-distributed likes and replies, for scale testing. '
+        'The same --seed always generates the same rows. Writes to the configured database, '
+        'so with PRODUCTION=true it refuses to run without --force.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Multiplier for every count not given explicitly (default: 1.0)')
+        for name, value in seed.BASE_COUNTS.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name,
+                                help=f'{"Average " if "_per_" in name else ""}{name.replace("_", " ")} '
+                                     f'(default: {value}{"" if "_per_" in name else " x scale"})')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT batch (default: 5000)')
+        parser.add_argument('--password',
+                            help='Let every seeded user log in with this password (default: unusable password)')
+        parser.add_argument('--force', action='store_true',
+                            help='Seed even though PRODUCTION is on, e.g. into a staging database')
+
+    def handle(self, *args, **options):
+        if settings.PRODUCTION and not options['force']:
+            raise CommandError(
+                'PRODUCTION is on, so this is the production database. '
+                'Pass --force to seed it anyway.'
+            )
+        if options['scale'] <= 0:
+            raise CommandError('--scale must be positive.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        overrides = {name: options[name] for name in seed.BASE_COUNTS}
+        if any(value is not None and value < 0 for value in overrides.values()):
+            raise CommandError('Counts must not be negative.')
+        if overrides['users'] == 0:
+            raise CommandError('--users must be at least 1.')
+        if CustomUser.objects.filter(username__startswith=seed.USERNAME_PREFIX).exists():
+            raise CommandError(
+                f'Users named {seed.USERNAME_PREFIX}* already exist; seed into an empty database '
+                '(or run flush first).'
+            )
+
+        counts = seed.counts_for(options['scale'], **overrides)
+        started = time.perf_counter()
+        rows = seed.seed(
+            seed=options['seed'], batch_size=options['batch_size'], counts=counts, password=options['password'],
+        )
+        elapsed = time.perf_counter() - started
+
+        for name, count in rows.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'Seeded {sum(rows.values())} row(s) in {elapsed:.1f}s.'))
+        if options['password']:
+            self.stdout.write(f'Users {seed.USERNAME_PREFIX}0.. can log in with the given password.')
@@ -0,0 +1,259 @@
+"""
+Synthetic data for the benchmark suite and for scale testing.
+
+``seed(scale, seed)`` fills a database with users, venues and their
+bookings, matches with their chat groups, participations and chats, and
+threads with likes and replies. Row counts grow linearly with ``scale`` (see
+BASE_COUNTS) unless given explicitly, and the same seed always produces the
+same rows, primary keys included. Seeded users cannot log in unless a
+password is asked for.
+
+Likes and replies follow a Zipf distribution over the threads, so a few
+threads are very hot and most get little attention, as on the real feed.
+Rows are generated lazily and written with ``bulk_create`` one batch at a
+time, so memory stays flat however many are asked for. The denormalized
+counters (participant_count, likeCount, replyCount) are filled in to match
+the rows created, since bulk inserts skip the signals and model methods that
+usually keep them in step.
+"""
+import random
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from accounts.models import CustomUser
+from booking_venue import facets
+from booking_venue.availability import SLOT_TIMES
+from booking_venue.models import Booking, Venue, name_initial
+from liveChat.models import Chat, Group
+from matches import schema, stats
+from matches.models import Match, Participation, SportCategory
+from sosmed_PBPF08 import response_cache
+from threads.models import ReplyChild, Thread
+
+USERNAME_PREFIX = "bench_user_"
+BATCH_SIZE = 1000
+
+# Rows per unit of scale; the *_per_* counts are averages and do not scale.
+BASE_COUNTS = {
+    "users": 100,
+    "venues": 30,
+    "matches": 50,
+    "threads": 300,
+    "participations_per_match": 6,
+    "chats_per_group": 20,
+    "likes_per_thread": 8,
+    "replies_per_thread": 3,
+    "bookings_per_venue": 20,
+}
+
+# Exponent of the Zipf distribution of likes and replies over threads.
+ZIPF_EXPONENT = 1.1
+# Bookings fall on days from BOOKING_DAYS[0] to BOOKING_DAYS[1] around today.
+BOOKING_DAYS = (-30, 60)
+BOOKING_STATUSES = (("confirmed", 6), ("pending", 3), ("cancelled", 1))
+
+TAGS = ["futsal", "basket", "lari", "badminton", "sepakbola", "depok", "jakarta", "turnamen", "latihan", "santai"]
+CITIES = [
+    ("Jakarta", "Indonesia"), ("Bandung", "Indonesia"), ("Surabaya", "Indonesia"),
+    ("Kuala Lumpur", "Malaysia"), ("Singapore", "Singapore"), ("Bangkok", "Thailand"),
+    ("Tokyo", "Japan"), ("Seoul", "South Korea"),
+]
+WORDS = ["main", "bareng", "yuk", "sore", "ini", "lapangan", "seru", "banget", "siapa", "ikut", "skor", "gol"]
+
+
+def counts_for(scale, **overrides):
+    """Row counts for ``scale``; keyword arguments that are not None replace single entries."""
+    counts = {
+        name: value if "_per_" in name else max(1, round(value * scale))
+        for name, value in BASE_COUNTS.items()
+    }
+    unknown = set(overrides) - set(counts)
+    if unknown:
+        raise ValueError(f"Unknown count(s): {', '.join(sorted(unknown))}")
+    counts.update({name: value for name, value in overrides.items() if value is not None})
+    return counts
+
+
+def _text(rng, words=8):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _bulk(model, objects, batch_size):
+    """``bulk_create`` an iterable of unsaved objects one batch at a time; return how many were written."""
+    objects = iter(objects)
+    written = 0
+    while batch := list(islice(objects, batch_size)):
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        written += len(batch)
+    return written
+
+
+def zipf_counts(rng, n, mean, cap, exponent=ZIPF_EXPONENT):
+    """
+    ``n`` counts averaging about ``mean``, each at most ``cap``, with the
+    k-th most popular item getting a share proportional to 1/k**exponent.
+    Popularity ranks are shuffled so hot items are spread over the list.
+    """
+    weights = [1 / rank ** exponent for rank in range(1, n + 1)]
+    scale = mean * n / sum(weights)
+    counts = []
+    for weight in weights:
+        expected = weight * scale
+        whole = int(expected)
+        counts.append(min(cap, whole + (rng.random() < expected - whole)))
+    rng.shuffle(counts)
+    return counts
+
+
+def _liker_field(model):
+    field = model._meta.get_field("liked_by")
+    return field.remote_field.through, f"{field.m2m_field_name()}_id", f"{field.m2m_reverse_field_name()}_id"
+
+
+def _venues(rng, count, bookings_per_venue, usernames, today):
+    """Venue objects plus ``(venue_id, date, time, username, status)`` for their bookings."""
+    venues, bookings = [], []
+    days = range(BOOKING_DAYS[0], BOOKING_DAYS[1] + 1)
+    slots = [(day, slot) for day in days for slot in SLOT_TIMES]
+    statuses, weights = zip(*BOOKING_STATUSES)
+    for i in range(count):
+        city, country = rng.choice(CITIES)
+        name = f"Stadion {city} {i}"
+        venue_id = _uuid(rng)
+        venues.append(Venue(
+            id=venue_id, name=name, location=f"{city}, {country}", capacity=rng.randint(1000, 80000),
+            description=_text(rng), price=Decimal(rng.randint(50, 500)),
+            city=city, country=country, initial=name_initial(name),
+        ))
+        # Distinct slots per venue, as unique_active_booking_slot requires.
+        taken = rng.sample(slots, min(len(slots), rng.randint(0, 2 * bookings_per_venue)))
+        bookings.extend(
+            (venue_id, today + timedelta(days=day), slot, rng.choice(usernames), rng.choices(statuses, weights)[0])
+            for day, slot in taken
+        )
+    return venues, bookings
+
+
+def seed(scale=1.0, seed=0, batch_size=BATCH_SIZE, counts=None, password=None):
+    """
+    Create the dataset and return the number of rows created per model.
+
+    ``counts`` is a dict like the one ``counts_for()`` returns and defaults to
+    ``counts_for(scale)``. Existing rows are left alone, but none of the
+    seeded usernames may be taken yet. Every user gets ``password``, or an
+    unusable one when it is None.
+    """
+    rng = random.Random(seed)
+    counts = counts or counts_for(scale)
+    now = timezone.now()
+    created = {}
+
+    with transaction.atomic():
+        SportCategory.objects.bulk_create(
+            [SportCategory(name=name, slug=slugify(name)) for name in schema.DEFAULT_CATEGORIES],
+            ignore_conflicts=True,
+        )
+        categories = list(SportCategory.objects.order_by("name"))
+
+        # Hashing is deliberately slow, so every user shares one hash.
+        password = make_password(password)
+        usernames = [f"{USERNAME_PREFIX}{i}" for i in range(counts["users"])]
+        created["users"] = _bulk(CustomUser, (
+            CustomUser(username=username, email=f"{username}@example.com", password=password)
+            for username in usernames
+        ), batch_size)
+
+        venues, bookings = _venues(rng, counts["venues"], counts["bookings_per_venue"], usernames, now.date())
+        created["venues"] = _bulk(Venue, venues, batch_size)
+        created["bookings"] = _bulk(Booking, (
+            Booking(id=_uuid(rng), venue_id=venue_id, date=day, time=slot, user_id=username, status=status)
+            for venue_id, day, slot, username, status in bookings
+        ), batch_size)
+        del venues, bookings
+
+        # (match id, group id, title, members) per match, filled in as the matches are generated.
+        plans = []
+
+        def matches():
+            for i in range(counts["matches"]):
+                max_members = rng.randint(6, 20)
+                # Leave room so the match_join journey has open slots to take.
+                size = min(len(usernames), max_members - 2, rng.randint(1, 2 * counts["participations_per_match"]))
+                members = rng.sample(usernames, size)
+                category = rng.choice(categories)
+                match_id, title = _uuid(rng), f"{category.name} {_text(rng, 2)} {i}"
+                plans.append((match_id, _uuid(rng), title, members))
+                yield Match(
+                    id=match_id,
+                    title=title,
+                    category=category,
+                    location=rng.choice(CITIES)[0],
+                    event_date=now + timedelta(days=rng.randint(-10, 60), hours=rng.randint(0, 23)),
+                    description=_text(rng),
+                    max_members=max_members,
+                    participant_count=len(members),
+                )
+
+        created["matches"] = _bulk(Match, matches(), batch_size)
+        _bulk(Group, (
+            Group(id=group_id, match_id=match_id, name=f"Group {title}")
+            for match_id, group_id, title, _ in plans
+        ), batch_size)
+        created["participations"] = _bulk(Participation, (
+            Participation(match_id=match_id, user_id=username)
+            for match_id, _, _, members in plans for username in members
+        ), batch_size)
+        created["chats"] = _bulk(Chat, (
+            Chat(group_id_id=group_id, username_id=rng.choice(members), message=_text(rng))
+            for _, group_id, _, members in plans
+            for _ in range(rng.randint(0, 2 * counts["chats_per_group"]))
+        ), batch_size)
+        del plans
+
+        like_counts = zipf_counts(rng, counts["threads"], counts["likes_per_thread"], cap=len(usernames))
+        reply_counts = zipf_counts(rng, counts["threads"], counts["replies_per_thread"], cap=len(usernames))
+        thread_ids = [_uuid(rng) for _ in range(counts["threads"])]
+        created["threads"] = _bulk(Thread, (
+            Thread(
+                id=thread_id,
+                user_id=rng.choice(usernames),
+                content=_text(rng, 12),
+                tags=",".join(rng.sample(TAGS, rng.randint(0, 3))),
+                likeCount=likes,
+                replyCount=replies,
+            )
+            for thread_id, likes, replies in zip(thread_ids, like_counts, reply_counts)
+        ), batch_size)
+        through, thread_column, user_column = _liker_field(Thread)
+        created["thread_likes"] = _bulk(through, (
+            through(**{thread_column: thread_id, user_column: username})
+            for thread_id, likes in zip(thread_ids, like_counts)
+            for username in rng.sample(usernames, likes)
+        ), batch_size)
+        created["replies"] = _bulk(ReplyChild, (
+            ReplyChild(id=_uuid(rng), thread_id=thread_id, user_id=rng.choice(usernames), content=_text(rng))
+            for thread_id, replies in zip(thread_ids, reply_counts)
+            for _ in range(replies)
+        ), batch_size)
+
+    # bulk_create skips Thread.save(), which keeps the tag index in step.
+    call_command("backfill_tags", batch_size=batch_size, stdout=StringIO())
+    # Only the caches derived from the seeded tables; sessions, presence and
+    # everything else in the shared cache are left alone.
+    response_cache.bump("threads", "matches", "venues")
+    stats.mark_stale()
+    facets.invalidate()
+    return created
@@ -0,0 +1,122 @@
+import random
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+from django.test import TestCase, override_settings
+
+from accounts.models import CustomUser
+from benchmarks import journeys, seed
+from booking_venue.models import Booking, Venue
+from liveChat.models import Chat
+from matches.models import Match
+from threads.models import Thread, ThreadTag
+
+
+class SeedTest(TestCase):
+    def test_counters_match_the_rows_created(self):
+        rows = seed.seed(scale=0.1, seed=1)
+
+        self.assertEqual(rows["matches"], Match.objects.count())
+        self.assertEqual(rows["chats"], Chat.objects.count())
+        for match in Match.objects.annotate(actual=Count("participations")):
+            self.assertEqual(match.participant_count, match.actual)
+            self.assertLess(match.participant_count, match.max_members)
+        threads = Thread.objects.annotate(likes=Count("liked_by", distinct=True), reply_rows=Count("replies", distinct=True))
+        for thread in threads:
+            self.assertEqual((thread.likeCount, thread.replyCount), (thread.likes, thread.reply_rows))
+        self.assertTrue(ThreadTag.objects.exists())
+        self.assertEqual(rows["bookings"], Booking.objects.count())
+
+    def test_same_seed_gives_the_same_rows(self):
+        first = seed.seed(scale=0.1, seed=7)
+        matches = sorted(Match.objects.values_list("id", "title"))
+        threads = sorted(Thread.objects.values_list("id", "likeCount"))
+        Match.objects.all().delete()
+        Venue.objects.all().delete()
+        CustomUser.objects.filter(username__startswith=seed.USERNAME_PREFIX).delete()
+
+        self.assertEqual(seed.seed(scale=0.1, seed=7), first)
+        self.assertEqual(sorted(Match.objects.values_list("id", "title")), matches)
+        self.assertEqual(sorted(Thread.objects.values_list("id", "likeCount")), threads)
+
+    def test_zipf_counts_are_skewed(self):
+        counts = sorted(seed.zipf_counts(random.Random(0), 1000, mean=8, cap=10_000), reverse=True)
+        self.assertAlmostEqual(sum(counts) / len(counts), 8, delta=0.5)
+        self.assertEqual(max(seed.zipf_counts(random.Random(0), 1000, mean=8, cap=50)), 50)
+        # The top 1% of items take a large share; most items get less than the mean.
+        self.assertGreater(sum(counts[:10]), sum(counts) / 4)
+        self.assertLess(counts[len(counts) // 2], 8)
+
+
+class SeedScaleCommandTest(TestCase):
+    def test_explicit_counts(self):
+        out = StringIO()
+        call_command("seed_scale", users=30, matches=4, threads=25, venues=2, batch_size=7, stdout=out)
+
+        self.assertEqual(CustomUser.objects.filter(username__startswith=seed.USERNAME_PREFIX).count(), 30)
+        self.assertEqual(Match.objects.count(), 4)
+        self.assertEqual(Thread.objects.count(), 25)
+        self.assertEqual(Venue.objects.count(), 2)
+        self.assertIn("Seeded", out.getvalue())
+
+    def test_users_cannot_log_in_unless_a_password_is_given(self):
+        call_command("seed_scale", users=2, matches=1, threads=1, venues=1, stdout=StringIO())
+        self.assertFalse(CustomUser.objects.get(username=f"{seed.USERNAME_PREFIX}0").has_usable_password())
+
+        CustomUser.objects.filter(username__startswith=seed.USERNAME_PREFIX).delete()
+        call_command("seed_scale", users=2, matches=1, threads=1, venues=1, seed=1,
+                     password="s3cret-pass", stdout=StringIO())
+        self.assertTrue(CustomUser.objects.get(username=f"{seed.USERNAME_PREFIX}0").check_password("s3cret-pass"))
+
+    @override_settings(PRODUCTION=True)
+    def test_refuses_in_production_unless_forced(self):
+        with self.assertRaises(CommandError):
+            call_command("seed_scale", scale=0.05, stdout=StringIO())
+        self.assertFalse(CustomUser.objects.filter(username__startswith=seed.USERNAME_PREFIX).exists())
+
+        call_command("seed_scale", scale=0.05, force=True, stdout=StringIO())
+        self.assertTrue(CustomUser.objects.filter(username__startswith=seed.USERNAME_PREFIX).exists())
+
+    def test_leaves_unrelated_cache_keys_alone(self):
+        cache.set("unrelated", "kept")
+        call_command("seed_scale", scale=0.05, stdout=StringIO())
+        self.assertEqual(cache.get("unrelated"), "kept")
+
+    def test_refuses_to_seed_twice(self):
+        call_command("seed_scale", scale=0.05, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command("seed_scale", scale=0.05, stdout=StringIO())
+
+
+@override_settings(PRESENCE_FLUSH_INTERVAL=3600, METRICS_FLUSH_INTERVAL=3600)
+class JourneyTest(TestCase):
+    def setUp(self):
+        seed.seed(scale=0.1, seed=0)
+
+    def test_every_journey_reports_latency_and_queries(self):
+        report = journeys.run(iterations=2)
+
+        self.assertEqual(list(report), list(journeys.JOURNEYS))
+        for name, result in report.items():
+            with self.subTest(journey=name):
+                self.assertGreater(result["requests"], 0)
+                self.assertEqual(result["errors"], 0)
+                latency = result["latency_ms"]
+                self.assertLessEqual(latency["p50"], latency["p95"])
+                self.assertLessEqual(latency["p95"], latency["p99"])
+                self.assertLessEqual(latency["p99"], latency["max"])
+                self.assertGreater(result["queries"]["max"], 0)
+
+    def test_unknown_journey(self):
+        with self.assertRaises(ValueError):
+            journeys.run(["checkout"], iterations=1)
+
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(
+            [journeys.percentile(values, p) for p in (50, 95, 99)], [50, 95, 99],
+        )
+        self.assertEqual(journeys.percentile([3.0], 99), 3.0)
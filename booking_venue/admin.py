@@ -4,6 +4,7 @@ from .models import Venue, Booking
 @admin.register(Venue)
 class VenueAdmin(admin.ModelAdmin):
     list_display = ('name', 'location', 'capacity', 'price')
+    list_filter = ('country',)
     search_fields = ('name', 'location')
 
 @admin.register(Booking)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BookingVenueConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'booking_venue'
+
+    def ready(self):
+        from . import signals  # noqa: F401
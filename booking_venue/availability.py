@@ -0,0 +1,37 @@
+"""
+Slot availability untuk venue.
+
+Satu hari dibagi menjadi slot per jam dari OPENING_HOUR sampai CLOSING_HOUR.
+Slot dianggap terpakai jika ada booking aktif (bukan 'cancelled') yang dimulai
+tepat pada jam tersebut -- aturan yang sama yang dijaga oleh constraint
+``unique_active_booking_slot`` di database.
+"""
+from datetime import time, timedelta
+
+from .models import Booking
+
+OPENING_HOUR = 8
+CLOSING_HOUR = 22
+MAX_RANGE_DAYS = 31
+
+SLOT_TIMES = [time(hour, 0) for hour in range(OPENING_HOUR, CLOSING_HOUR)]
+
+
+def taken_slots(venue, start, end):
+    """Set of (date, time) held by active bookings of ``venue`` in [start, end], in one query."""
+    return set(
+        Booking.objects.filter(venue=venue, date__range=(start, end))
+        .exclude(status='cancelled')
+        .values_list('date', 'time')
+    )
+
+
+def free_slots(venue, start, end):
+    """Map each date in [start, end] to the slot times that are still free."""
+    taken = taken_slots(venue, start, end)
+    slots = {}
+    day = start
+    while day <= end:
+        slots[day] = [slot for slot in SLOT_TIMES if (day, slot) not in taken]
+        day += timedelta(days=1)
+    return slots
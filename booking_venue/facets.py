@@ -0,0 +1,33 @@
+"""
+Facet region (negara) untuk filter di main_page.
+
+Hasil DISTINCT + COUNT disimpan di cache dan dibuang oleh booking_venue.signals
+setiap kali ada Venue yang disimpan atau dihapus. Penulisan yang melewati
+signal (bulk_create / bulk_update di load_venues) harus memanggil
+``invalidate()`` sendiri.
+"""
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Venue
+
+REGION_FACET_KEY = 'booking_venue:region_facet'
+REGION_FACET_TIMEOUT = 60 * 60
+
+
+def region_facet():
+    """List of {'country', 'count'} for every country with at least one venue, sorted by country."""
+    facet = cache.get(REGION_FACET_KEY)
+    if facet is None:
+        facet = list(
+            Venue.objects.exclude(country='')
+            .order_by('country')
+            .values('country')
+            .annotate(count=Count('id'))
+        )
+        cache.set(REGION_FACET_KEY, facet, timeout=REGION_FACET_TIMEOUT)
+    return facet
+
+
+def invalidate(**kwargs):
+    cache.delete(REGION_FACET_KEY)
@@ -1,12 +1,29 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from . import availability
 from .models import Booking
 from datetime import datetime
 
 
 class BookingForm(forms.Form):
     date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
-    time = forms.TimeField(widget=forms.TimeInput(attrs={'type': 'time'}))
+    time = forms.TimeField(widget=forms.TimeInput(attrs={
+        'type': 'time',
+        'step': 3600,
+        'min': availability.SLOT_TIMES[0].strftime('%H:%M'),
+        'max': availability.SLOT_TIMES[-1].strftime('%H:%M'),
+    }))
+
+    def clean_time(self):
+        # Hanya slot per jam yang dikenal availability; jam lain (mis. 10:30) tidak
+        # akan bentrok dengan unique_active_booking_slot maupun free_slots.
+        time = self.cleaned_data['time']
+        if time not in availability.SLOT_TIMES:
+            first, last = availability.SLOT_TIMES[0], availability.SLOT_TIMES[-1]
+            raise ValidationError(
+                f"Choose an hourly slot between {first:%H:%M} and {last:%H:%M}."
+            )
+        return time
 
     def clean(self):
         cleaned_data = super().clean()
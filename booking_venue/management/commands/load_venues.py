@@ -1,27 +1,124 @@
 import csv
-from django.core.management.base import BaseCommand
-from booking_venue.models import Venue
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from booking_venue import facets
+from sosmed_PBPF08 import response_cache
+from booking_venue.models import Venue, name_initial, split_location
+
+DEFAULT_FILE = 'Football Stadiums.csv'
+DEFAULT_CONFEDERATIONS = ['AFC']
+DEFAULT_CAPACITY = 10000
+DEFAULT_PRICE = Decimal('100.00')
+
+# Kolom yang diambil dari CSV; price sengaja tidak ikut supaya harga yang
+# sudah diubah admin tidak tertimpa saat import ulang.
+CSV_FIELDS = ['location', 'capacity', 'description', 'city', 'country', 'initial']
+
+
+def venue_rows(file, confederations):
+    """Yield Venue field values per CSV row, reading the file lazily."""
+    for row in csv.DictReader(file):
+        if confederations and row['Confederation'].upper() not in confederations:
+            continue
+        location = f"{row['City']}, {row['Country']}"
+        city, country = split_location(location)
+        yield {
+            'name': row['Stadium'],
+            'location': location,
+            'capacity': int(row['Capacity']) if row['Capacity'].isdigit() else DEFAULT_CAPACITY,
+            'description': f"Football stadium in {row['City']}, {row['Country']}. Home to: {row['HomeTeams']}",
+            'city': city,
+            'country': country,
+            'initial': name_initial(row['Stadium']),
+        }
+
 
 class Command(BaseCommand):
     help = 'Load venues from CSV file'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=DEFAULT_FILE, help=f'CSV to read (default: "{DEFAULT_FILE}")')
+        parser.add_argument(
+            '--confederation',
+            action='append',
+            dest='confederations',
+            help='Only load this confederation; repeat for several, or pass "all" (default: AFC)',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per INSERT / UPDATE (default: 500)')
+
     def handle(self, *args, **options):
-        with open('Football Stadiums.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if row['Confederation'] != 'AFC':
-                    continue
-                # Create venue with appropriate data
-                venue, created = Venue.objects.get_or_create(
-                    name=row['Stadium'],
-                    defaults={
-                        'location': f"{row['City']}, {row['Country']}",
-                        'capacity': int(row['Capacity']) if row['Capacity'].isdigit() else 10000,
-                        'description': f"Football stadium in {row['City']}, {row['Country']}. Home to: {row['HomeTeams']}",
-                        'price': 100.00  # Default price
-                    }
-                )
-                if created:
-                    self.stdout.write(f'Created venue: {venue.name}')
-                else:
-                    self.stdout.write(f'Venue already exists: {venue.name}')
\ No newline at end of file
+        confederations = {c.upper() for c in options['confederations'] or DEFAULT_CONFEDERATIONS}
+        if 'ALL' in confederations:
+            confederations = set()
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        started = time.perf_counter()
+        try:
+            with open(options['file'], 'r', encoding='utf-8') as file, transaction.atomic():
+                counts = self._load(venue_rows(file, confederations), batch_size, options['verbosity'])
+        except FileNotFoundError:
+            raise CommandError(f"File not found: {options['file']}")
+        elapsed = time.perf_counter() - started
+
+        # bulk_create / bulk_update tidak memicu signal Venue.
+        facets.invalidate()
+        response_cache.bump('venues')
+
+        rate = counts['rows'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {counts['rows']} row(s) in {elapsed:.2f}s ({rate:.0f} rows/sec): "
+            f"{counts['created']} created, {counts['updated']} updated, {counts['unchanged']} unchanged."
+        ))
+
+    def _load(self, rows, batch_size, verbosity):
+        # Satu query untuk semua venue yang sudah ada; nama dipakai sebagai kunci.
+        existing = {}
+        for venue in Venue.objects.only('id', 'name', *CSV_FIELDS).order_by('name', 'id'):
+            existing.setdefault(venue.name, venue)
+
+        counts = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0}
+        seen = set()
+        to_create, to_update = [], []
+        for values in rows:
+            counts['rows'] += 1
+            name = values['name']
+            if name in seen:
+                # Nama yang sama muncul lagi di CSV: baris pertama yang dipakai.
+                counts['unchanged'] += 1
+                continue
+            seen.add(name)
+
+            venue = existing.get(name)
+            if venue is None:
+                to_create.append(Venue(price=DEFAULT_PRICE, **values))
+                counts['created'] += 1
+                if verbosity > 1:
+                    self.stdout.write(f'Created venue: {name}')
+            elif any(getattr(venue, field) != values[field] for field in CSV_FIELDS):
+                for field in CSV_FIELDS:
+                    setattr(venue, field, values[field])
+                to_update.append(venue)
+                counts['updated'] += 1
+                if verbosity > 1:
+                    self.stdout.write(f'Updated venue: {name}')
+            else:
+                counts['unchanged'] += 1
+
+            if len(to_create) >= batch_size:
+                Venue.objects.bulk_create(to_create)
+                to_create = []
+            if len(to_update) >= batch_size:
+                Venue.objects.bulk_update(to_update, CSV_FIELDS)
+                to_update = []
+
+        if to_create:
+            Venue.objects.bulk_create(to_create)
+        if to_update:
+            Venue.objects.bulk_update(to_update, CSV_FIELDS)
+        return counts
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:51
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, Value, When
+
+
+def cancel_conflicting_bookings(apps, schema_editor):
+    Booking = apps.get_model('booking_venue', 'Booking')
+    active = Booking.objects.exclude(status='cancelled')
+    conflicts = (
+        active.order_by()
+        .values('venue', 'date', 'time')
+        .annotate(total=Count('pk'))
+        .filter(total__gt=1)
+    )
+    for slot in conflicts:
+        # Keep a confirmed booking over a pending one; cancel the rest.
+        rows = active.filter(venue=slot['venue'], date=slot['date'], time=slot['time']).order_by(
+            Case(When(status='confirmed', then=Value(0)), default=Value(1), output_field=IntegerField()),
+            'pk',
+        )
+        keep = rows.values_list('pk', flat=True).first()
+        rows.exclude(pk=keep).order_by().update(status='cancelled')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_venue', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_conflicting_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'cancelled'), _negated=True), fields=('venue', 'date', 'time'), name='unique_active_booking_slot'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+from booking_venue.models import name_initial, split_location
+
+
+def fill_region_columns(apps, schema_editor):
+    Venue = apps.get_model('booking_venue', 'Venue')
+    venues = list(Venue.objects.only('id', 'name', 'location'))
+    for venue in venues:
+        venue.city, venue.country = split_location(venue.location)
+        venue.initial = name_initial(venue.name)
+    Venue.objects.bulk_update(venues, ['city', 'country', 'initial'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_venue', '0002_unique_active_booking_slot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venue',
+            name='city',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='country',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='initial',
+            field=models.CharField(blank=True, editable=False, max_length=1),
+        ),
+        migrations.RunPython(fill_region_columns, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='venue',
+            index=models.Index(fields=['country', 'name'], name='venue_country_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venue',
+            index=models.Index(fields=['initial', 'name'], name='venue_initial_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
+import string
 import uuid
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 from accounts.models import CustomUser
 
@@ -12,10 +14,41 @@ class Venue(models.Model):
     capacity = models.PositiveIntegerField()
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Diturunkan dari location / name saat save() supaya filter region dan
+    # huruf awal di main_page bisa pakai index, bukan icontains.
+    city = models.CharField(max_length=255, blank=True, editable=False)
+    country = models.CharField(max_length=255, blank=True, editable=False)
+    initial = models.CharField(max_length=1, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['country', 'name'], name='venue_country_idx'),
+            models.Index(fields=['initial', 'name'], name='venue_initial_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.city, self.country = split_location(self.location)
+        self.initial = name_initial(self.name)
+        super().save(*args, **kwargs)
+
+
+def split_location(location):
+    """'City, Country' -> ('City', 'Country'); tanpa koma dianggap tidak punya region."""
+    if ', ' not in location:
+        return location.strip(), ''
+    city, country = location.rsplit(', ', 1)
+    return city.strip(), country.strip()
+
+
+def name_initial(name):
+    """Huruf awal A-Z (kapital) dari nama venue, atau '#' untuk selain itu."""
+    # upper() can give two letters ('ß' -> 'SS', 'ﬁ' -> 'FI'), which would not fit in initial.
+    first = name[:1].upper()
+    return first if len(first) == 1 and first in string.ascii_uppercase else '#'
+
 
 class Booking(models.Model):
     STATUS_CHOICES = [
@@ -31,5 +64,16 @@ class Booking(models.Model):
     time = models.TimeField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
 
+    class Meta:
+        constraints = [
+            # Satu slot (venue, date, time) hanya boleh dipegang satu booking aktif.
+            # Partial index: booking yang dibatalkan tidak menghalangi booking baru.
+            models.UniqueConstraint(
+                fields=['venue', 'date', 'time'],
+                condition=~Q(status='cancelled'),
+                name='unique_active_booking_slot',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.venue.name} on {self.date}"
\ No newline at end of file
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from sosmed_PBPF08 import response_cache
+
+from . import facets
+from .models import Venue
+
+
+@receiver(post_save, sender=Venue)
+@receiver(post_delete, sender=Venue)
+def refresh_region_facet(sender, **kwargs):
+    facets.invalidate()
+
+
+@receiver(post_save, sender=Venue)
+@receiver(post_delete, sender=Venue)
+def refresh_venue_responses(sender, **kwargs):
+    response_cache.bump("venues")
@@ -1,8 +1,17 @@
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, transaction
+from . import facets
 from .models import Venue, Booking
-from datetime import date, time
+from .availability import CLOSING_HOUR, OPENING_HOUR
+from datetime import date, time, timedelta
+from io import StringIO
+import os
+import tempfile
 
 
 class VenueModelTest(TestCase):
@@ -27,6 +36,113 @@ class VenueModelTest(TestCase):
         self.assertEqual(str(self.venue), "Test Stadium")
 
 
+class VenueRegionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for name, location in [
+            ("Gelora Bung Karno", "Jakarta, Indonesia"),
+            ("Jakarta International Stadium", "Jakarta, Indonesia"),
+            ("Bukit Jalil", "Kuala Lumpur, Malaysia"),
+            ("1st Stadium", "Nowhere"),
+        ]:
+            Venue.objects.create(
+                name=name, location=location, capacity=1000, description="-", price=100.00
+            )
+
+    def test_region_columns_are_derived_on_save(self):
+        """Test that city, country and initial follow location and name"""
+        venue = Venue.objects.get(name="Bukit Jalil")
+        self.assertEqual((venue.city, venue.country, venue.initial), ("Kuala Lumpur", "Malaysia", "B"))
+        other = Venue.objects.get(name="1st Stadium")
+        self.assertEqual((other.country, other.initial), ("", "#"))
+
+    def test_initial_is_one_letter_even_when_upper_case_is_longer(self):
+        """Test that names whose capital is two letters are filed under '#'"""
+        for name in ("ßtadion", "ﬁeld Arena", "Élan Park"):
+            venue = Venue.objects.create(name=name, location="Berlin, Germany", capacity=1, description="", price=1)
+            self.assertEqual(venue.initial, "#")
+
+    def test_region_facet_is_cached_with_counts(self):
+        """Test that the region facet counts venues per country and is served from cache"""
+        self.assertEqual(facets.region_facet(), [
+            {'country': 'Indonesia', 'count': 2},
+            {'country': 'Malaysia', 'count': 1},
+        ])
+        with self.assertNumQueries(0):
+            facets.region_facet()
+
+        Venue.objects.create(
+            name="Rajamangala", location="Bangkok, Thailand", capacity=1000, description="-", price=100.00
+        )
+        self.assertIn({'country': 'Thailand', 'count': 1}, facets.region_facet())
+
+    def test_main_page_filters_by_region_and_initial(self):
+        """Test that region and alphabet filters use the derived columns"""
+        url = reverse('booking_venue:main_page')
+        response = self.client.get(url, {'region': 'Indonesia', 'alphabet': 'g'})
+        self.assertEqual([v.name for v in response.context['venues']], ["Gelora Bung Karno"])
+
+        response = self.client.get(url, {'alphabet': 'other'})
+        self.assertEqual([v.name for v in response.context['venues']], ["1st Stadium"])
+
+        with self.assertNumQueries(1):  # venue list only; facet comes from cache
+            self.client.get(url, {'region': 'Malaysia'})
+
+
+class LoadVenuesCommandTest(TestCase):
+    CSV = (
+        "Confederation,Stadium,City,HomeTeams,Capacity,Country,IOC,Population\n"
+        "AFC,Gelora Bung Karno,Jakarta,Persija,77193,Indonesia,INA,1\n"
+        "AFC,Gelora Bung Karno,Jakarta,Persija,77193,Indonesia,INA,1\n"
+        "AFC,Bukit Jalil,Kuala Lumpur,Malaysia,n/a,Malaysia,MAS,1\n"
+        "UEFA,Wembley,London,England,90000,England,ENG,1\n"
+    )
+
+    def setUp(self):
+        cache.clear()
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False)
+        with handle:
+            handle.write(self.CSV)
+        self.path = handle.name
+        self.addCleanup(os.remove, self.path)
+
+    def load(self, *args):
+        out = StringIO()
+        call_command('load_venues', '--file', self.path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_loads_selected_confederation_in_bulk(self):
+        """Test that rows are filtered, deduplicated and inserted with a fixed number of queries"""
+        facets.region_facet()
+        with self.assertNumQueries(4):  # savepoint, prefetch, one INSERT, release
+            output = self.load()
+        self.assertIn('2 created', output)
+        self.assertIn('rows/sec', output)
+
+        venue = Venue.objects.get(name='Bukit Jalil')
+        self.assertEqual(venue.capacity, 10000)
+        self.assertEqual((venue.city, venue.country, venue.initial), ('Kuala Lumpur', 'Malaysia', 'B'))
+        self.assertFalse(Venue.objects.filter(name='Wembley').exists())
+        self.assertEqual(len(facets.region_facet()), 2)
+
+    def test_rerun_updates_existing_venues_only(self):
+        """Test that a second run updates changed rows instead of duplicating them"""
+        self.load('--confederation', 'all')
+        Venue.objects.filter(name='Wembley').update(capacity=1, price=250)
+
+        output = self.load('--confederation', 'all', '--batch-size', '1')
+        self.assertIn('0 created, 1 updated', output)
+        self.assertEqual(Venue.objects.count(), 3)
+        wembley = Venue.objects.get(name='Wembley')
+        self.assertEqual(wembley.capacity, 90000)
+        self.assertEqual(wembley.price, 250)
+
+    def test_missing_file_is_reported(self):
+        """Test that an unknown path raises a CommandError"""
+        with self.assertRaises(CommandError):
+            call_command('load_venues', '--file', self.path + '.missing', stdout=StringIO())
+
+
 class BookingModelTest(TestCase):
     def setUp(self):
         # Create a test user
@@ -65,16 +181,39 @@ class BookingModelTest(TestCase):
     def test_booking_status_choices(self):
         """Test that booking status choices are valid"""
         valid_statuses = ['pending', 'confirmed', 'cancelled']
-        for status in valid_statuses:
+        for hour, status in enumerate(valid_statuses, start=15):
             booking = Booking.objects.create(
                 user=self.user,
                 venue=self.venue,
                 date=date.today(),
-                time=time(15, 0),
+                time=time(hour, 0),
                 status=status
             )
             self.assertEqual(booking.status, status)
 
+    def test_active_slot_cannot_be_double_booked(self):
+        """Test that the database rejects a second active booking for the same slot"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Booking.objects.create(
+                user=self.user,
+                venue=self.venue,
+                date=self.booking.date,
+                time=self.booking.time,
+                status='confirmed'
+            )
+
+    def test_cancelled_slot_can_be_booked_again(self):
+        """Test that a cancelled booking frees its slot"""
+        self.booking.status = 'cancelled'
+        self.booking.save()
+        rebooked = Booking.objects.create(
+            user=self.user,
+            venue=self.venue,
+            date=self.booking.date,
+            time=self.booking.time
+        )
+        self.assertEqual(rebooked.status, 'pending')
+
     def test_booking_str_method(self):
         """Test the string representation of Booking model"""
         expected_str = f"{self.user.username} - {self.venue.name} on {self.booking.date}"
@@ -110,6 +249,17 @@ class VenueViewTest(TestCase):
         self.assertEqual(len(data['venues']), 1)
         self.assertEqual(data['venues'][0]['name'], self.venue.name)
 
+    def test_api_venues_is_cached_until_a_venue_changes(self):
+        cache.clear()
+        url = reverse('booking_venue:api_venues')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        self.venue.name = "Renamed Stadium"
+        self.venue.save()
+        self.assertEqual(self.client.get(url).json()['venues'][0]['name'], "Renamed Stadium")
+
 
 class BookingViewTest(TestCase):
     def setUp(self):
@@ -188,6 +338,83 @@ class BookingViewTest(TestCase):
         self.assertFalse(booking_exists)
 
 
+class VenueAvailabilityTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User = get_user_model()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.venue = Venue.objects.create(
+            name="Test Stadium",
+            location="Jakarta, Indonesia",
+            capacity=50000,
+            description="A beautiful football stadium",
+            price=100.00
+        )
+        self.day = date.today() + timedelta(days=1)
+        self.url = reverse('booking_venue:api_venue_availability', args=[self.venue.id])
+
+    def test_free_slots_over_range_in_one_booking_query(self):
+        """Test that taken and cancelled slots are reported across a date range"""
+        Booking.objects.create(user=self.user, venue=self.venue, date=self.day, time=time(10, 0))
+        Booking.objects.create(
+            user=self.user, venue=self.venue, date=self.day, time=time(11, 0), status='cancelled'
+        )
+        end = self.day + timedelta(days=2)
+
+        with self.assertNumQueries(2):  # venue + bookings
+            response = self.client.get(self.url, {'start': self.day.isoformat(), 'end': end.isoformat()})
+
+        self.assertEqual(response.status_code, 200)
+        slots = response.json()['slots']
+        self.assertEqual(len(slots), 3)
+        first_day = slots[self.day.isoformat()]
+        self.assertNotIn('10:00', first_day)
+        self.assertIn('11:00', first_day)
+        self.assertEqual(len(first_day), CLOSING_HOUR - OPENING_HOUR - 1)
+        self.assertEqual(len(slots[end.isoformat()]), CLOSING_HOUR - OPENING_HOUR)
+
+    def test_invalid_range_is_rejected(self):
+        """Test that malformed, reversed and oversized ranges return 400"""
+        for params in (
+            {'start': 'besok'},
+            {'start': '2026-02-30'},
+            {'start': self.day.isoformat(), 'end': (self.day - timedelta(days=1)).isoformat()},
+            {'start': self.day.isoformat(), 'end': (self.day + timedelta(days=60)).isoformat()},
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('errors', response.json())
+
+    def test_off_slot_time_is_rejected(self):
+        """Test that a time between hourly slots cannot sidestep the slot constraint"""
+        Booking.objects.create(user=self.user, venue=self.venue, date=self.day, time=time(10, 0))
+
+        self.client.login(username='testuser', password='testpass123')
+        for value in ('10:30', '07:00', '22:00'):
+            with self.subTest(time=value):
+                response = self.client.post(
+                    reverse('booking_venue:book_venue', args=[self.venue.id]),
+                    {'date': self.day.isoformat(), 'time': value}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('time', response.context['form'].errors)
+        self.assertEqual(Booking.objects.filter(venue=self.venue).count(), 1)
+
+    def test_conflicting_booking_is_rejected(self):
+        """Test that booking a taken slot through the view does not create a second booking"""
+        other = get_user_model().objects.create_user(username='other', password='testpass123')
+        Booking.objects.create(user=other, venue=self.venue, date=self.day, time=time(15, 0))
+
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(
+            reverse('booking_venue:book_venue', args=[self.venue.id]),
+            {'date': self.day.isoformat(), 'time': '15:00'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'already booked')
+        self.assertEqual(Booking.objects.filter(venue=self.venue, date=self.day).count(), 1)
+
+
 class BookingIntegrationTest(TestCase):
     def setUp(self):
         self.client = Client()
@@ -9,4 +9,5 @@ urlpatterns = [
     path('my-bookings/', views.my_bookings, name='my_bookings'),
     path('cancel/<uuid:booking_id>/', views.cancel_booking, name='cancel_booking'),
     path('show-json/', views.api_venues, name='api_venues'),
+    path('availability/<uuid:venue_id>/', views.api_venue_availability, name='api_venue_availability'),
 ]
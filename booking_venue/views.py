@@ -2,9 +2,14 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.forms import UserCreationForm
+from django.db import IntegrityError, transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.http import JsonResponse
 from django.core import serializers
+from datetime import timedelta
+from sosmed_PBPF08 import response_cache
+from . import availability, facets
 from .models import Venue, Booking
 from .forms import BookingForm
 
@@ -19,22 +24,15 @@ def main_page(request):
     alphabet_filter = request.GET.get('alphabet', '')
 
     if region_filter:
-        venues = venues.filter(location__icontains=region_filter)
+        venues = venues.filter(country=region_filter)
 
     if alphabet_filter:
         if alphabet_filter == 'other':
-            venues = venues.exclude(name__regex=r'^[A-Za-z]')
+            venues = venues.filter(initial='#')
         else:
-            venues = venues.filter(name__istartswith=alphabet_filter)
+            venues = venues.filter(initial=alphabet_filter[:1].upper())
 
-
-    all_venues = Venue.objects.all()
-    regions = set()
-    for venue in all_venues:
-        if ', ' in venue.location:
-            country = venue.location.split(', ')[-1]
-            regions.add(country)
-    regions = sorted(list(regions))
+    regions = facets.region_facet()
 
     return render(request, 'main_page.html', {
         'venues': venues,
@@ -68,9 +66,14 @@ def book_venue(request, venue_id):
             )
 
             try:
-                booking.save()
+                # Slot yang sudah terpakai ditolak oleh constraint
+                # unique_active_booking_slot, bukan dicek dulu di Python.
+                with transaction.atomic():
+                    booking.save()
                 messages.success(request, f'Booking stadion {venue.name} berhasil!')
                 return redirect('booking_success')
+            except IntegrityError:
+                form.add_error('time', 'This time slot is already booked. Please choose another time.')
             except Exception as e:
                 messages.error(request, f'Error saving booking: {e}')
     else:
@@ -101,18 +104,63 @@ def cancel_booking(request, booking_id):
 def api_venues(request):
     """
     API endpoint to get venues data for frontend.
+    Hasilnya di-cache sampai ada Venue yang berubah.
     """
-    venues = Venue.objects.all()
+    def build():
+        venues_data = []
+        for venue in Venue.objects.all():
+            venues_data.append({
+                'id': str(venue.id),
+                'name': venue.name,
+                'location': venue.location,
+                'capacity': venue.capacity,
+                'description': venue.description,
+                'price_per_hour': 100.00,
+            })
+        return venues_data
+
+    venues_data = response_cache.cached(['venues'], 'booking_venue:api_venues', build)
+    return JsonResponse({'venues': venues_data})
 
-    venues_data = []
-    for venue in venues:
-        venues_data.append({
-            'id': str(venue.id),
-            'name': venue.name,
-            'location': venue.location,
-            'capacity': venue.capacity,
-            'description': venue.description,
-            'price_per_hour': 100.00,
-        })
 
-    return JsonResponse({'venues': venues_data})
+def _date_param(request, name, default):
+    """Tanggal YYYY-MM-DD dari query string; None jika formatnya salah."""
+    value = request.GET.get(name)
+    if not value:
+        return default
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+def api_venue_availability(request, venue_id):
+    """
+    API endpoint slot kosong sebuah venue untuk rentang tanggal.
+    Query string: ?start=YYYY-MM-DD&end=YYYY-MM-DD (default: 7 hari mulai hari ini).
+    Semua booking dalam rentang diambil dengan satu query.
+    """
+    venue = get_object_or_404(Venue, id=venue_id)
+
+    start = _date_param(request, 'start', timezone.localdate())
+    end = _date_param(request, 'end', start and start + timedelta(days=6))
+    if start is None or end is None:
+        return JsonResponse({'errors': {'__all__': ['Dates must use the YYYY-MM-DD format.']}}, status=400)
+    if end < start:
+        return JsonResponse({'errors': {'end': ['End date must not be before start date.']}}, status=400)
+    if (end - start).days >= availability.MAX_RANGE_DAYS:
+        return JsonResponse(
+            {'errors': {'end': [f'Range is limited to {availability.MAX_RANGE_DAYS} days.']}},
+            status=400,
+        )
+
+    slots = availability.free_slots(venue, start, end)
+    return JsonResponse({
+        'venue': str(venue.id),
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'slots': {
+            day.isoformat(): [slot.strftime('%H:%M') for slot in free]
+            for day, free in slots.items()
+        },
+    })
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('liveChat', '0006_alter_chat_options'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['group_id', 'createdAt'], name='chat_group_created_idx'),
+        ),
+    ]
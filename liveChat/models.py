@@ -3,6 +3,8 @@ from accounts.models import CustomUser
 from matches.models import Match
 import uuid
 
+DEFAULT_PROFILE_PICTURE = "https://cdn-icons-png.flaticon.com/512/847/847969.png"
+
 # Create your models here.
 
 class Group(models.Model):
@@ -39,6 +41,17 @@ class Chat(models.Model):
     class Meta:
         ordering = ["-createdAt"]
         get_latest_by = "createdAt"
+        indexes = [
+            models.Index(fields=["group_id", "createdAt"], name="chat_group_created_idx"),
+        ]
 
     def __str__(self):
-        return f"group_id: {self.group_id}, username: {self.username}, message: \"{self.message}\""
\ No newline at end of file
+        return f"group_id: {self.group_id}, username: {self.username}, message: \"{self.message}\""
+
+    def to_dict(self):
+        return {
+            "username": self.username.pk,
+            "message": self.message,
+            "createdAt": self.createdAt.isoformat(),
+            "profile_picture": self.username.profile_picture.url if self.username.profile_picture else DEFAULT_PROFILE_PICTURE,
+        }
@@ -0,0 +1,144 @@
+"""
+Fan-out of new chat messages to open stream / long-poll connections.
+
+The broker used is configured with ``settings.LIVECHAT_BROKER``:
+
+- ``liveChat.pubsub.InProcessBroker`` (default) pushes messages published by
+  this process to subscribers in this process. Good for a single worker.
+- ``liveChat.pubsub.DatabasePollingBroker`` lets every subscriber poll the
+  ``Chat`` table itself, so messages written by any worker are delivered.
+
+A custom backend only needs ``publish(group_id, payload)`` and
+``subscribe(group_id)`` returning an object with ``async get(timeout)``,
+``close()`` and context-manager support.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """A queue of payloads for one group, consumed from one event loop."""
+
+    def __init__(self, broker, group_id):
+        self.broker = broker
+        self.group_id = str(group_id)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    async def get(self, timeout):
+        """Return the next payload, or None if nothing arrived within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, group_id):
+        subscription = Subscription(self, group_id)
+        with self._lock:
+            self._subscriptions[subscription.group_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.group_id)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.group_id]
+
+    def publish(self, group_id, payload):
+        # Called from sync code (signal handlers), so hand the payload over to
+        # each subscriber's own event loop instead of touching its queue here.
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(str(group_id), ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, payload)
+            except RuntimeError:
+                # The subscriber's loop has already been closed.
+                self.unsubscribe(subscription)
+
+
+class PollingSubscription(Subscription):
+    def __init__(self, broker, group_id):
+        super().__init__(broker, group_id)
+        self.last_seen = None
+
+    async def get(self, timeout):
+        if not self.queue.empty():
+            return self.queue.get_nowait()
+
+        deadline = self.loop.time() + timeout
+        while True:
+            for payload in await sync_to_async(self.broker.fetch_new)(self.group_id, self.last_seen):
+                self.last_seen = payload["createdAt"]
+                self.queue.put_nowait(payload)
+            if not self.queue.empty():
+                return self.queue.get_nowait()
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(self.broker.interval, remaining))
+
+
+class DatabasePollingBroker:
+    def __init__(self):
+        self.interval = getattr(settings, "LIVECHAT_POLL_INTERVAL", 1)
+
+    def subscribe(self, group_id):
+        subscription = PollingSubscription(self, group_id)
+        subscription.last_seen = timezone.now().isoformat()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        pass
+
+    def publish(self, group_id, payload):
+        # Subscribers read new rows straight from the database.
+        pass
+
+    def fetch_new(self, group_id, since):
+        from .models import Chat
+
+        chats = (
+            Chat.objects.filter(group_id=group_id, createdAt__gt=since)
+            .select_related("username")
+            .order_by("createdAt")
+        )
+        return [chat.to_dict() for chat in chats]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, "LIVECHAT_BROKER", "liveChat.pubsub.InProcessBroker")
+                _broker = import_string(path)()
+    return _broker
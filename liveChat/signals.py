@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Chat
+from .pubsub import get_broker
+
+
+@receiver(post_save, sender=Chat)
+def publish_new_chat(sender, instance, created, **kwargs):
+    if not created:
+        return
+    group_id = instance.group_id_id
+    payload = instance.to_dict()
+    transaction.on_commit(lambda: get_broker().publish(group_id, payload))
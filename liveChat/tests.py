@@ -1,10 +1,12 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
 from accounts.models import CustomUser
 from matches.models import Match, Participation, SportCategory
 from liveChat.models import Group, Chat
+from liveChat.pubsub import InProcessBroker, get_broker
+from unittest import mock
 import json
 import uuid
 
@@ -90,9 +92,13 @@ class LiveChatGroupTestCase(TestCase):
         self.client.login(username='chat_admin', password='admin123')
         response = self.client.get(reverse('liveChat:operate_group'))
         self.assertEqual(response.status_code, 200)
-        data = json.loads(response.content)
+        data = json.loads(b''.join(response.streaming_content))
         self.assertIn('data', data)
         self.assertGreaterEqual(len(data['data']), 2)
+        self.assertEqual(
+            {group['fields']['name'] for group in data['data']},
+            set(Group.objects.values_list('name', flat=True)),
+        )
 
     def test_get_specific_group_as_member(self):
         """Test getting specific group details as a member"""
@@ -115,6 +121,46 @@ class LiveChatGroupTestCase(TestCase):
         data = json.loads(response.content)
         self.assertIn('data', data)
 
+    def test_get_user_groups_includes_members_and_last_chat(self):
+        Participation.objects.create(match=self.match1, user=self.user2, message='')
+        Chat.objects.create(group_id=self.group1, username=self.user1, message='First')
+        Chat.objects.create(group_id=self.group1, username=self.user2, message='Latest')
+        self.client.login(username='chat_user2', password='chat123')
+        response = self.client.get(reverse('liveChat:operate_group'))
+        groups = json.loads(response.content)['data']
+        self.assertEqual([group['name'] for group in groups], ['Group Basketball Game', 'Group Basketball Tournament'])
+        self.assertCountEqual(groups[0]['members'], ['chat_user1', 'chat_user2'])
+        self.assertEqual(groups[0]['last_chat']['message'], 'Latest')
+        self.assertEqual(groups[0]['last_chat']['username'], 'chat_user2')
+        self.assertIsNone(groups[1]['last_chat'])
+
+    @override_settings(PRESENCE_FLUSH_INTERVAL=3600)
+    def test_get_user_groups_query_count_is_constant(self):
+        for i in range(5):
+            match = Match.objects.create(
+                title=f'Extra Game {i}',
+                category=self.category,
+                location='Court C',
+                event_date=timezone.now() + timedelta(days=3),
+                max_members=8
+            )
+            group = Group.objects.create(match=match, name=f'Group Extra Game {i}')
+            Participation.objects.create(match=match, user=self.user1, message='')
+            Participation.objects.create(match=match, user=self.user2, message='')
+            Chat.objects.create(group_id=group, username=self.user2, message='Hi')
+        self.client.login(username='chat_user1', password='chat123')
+        # session, user, groups with last chat, members
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('liveChat:operate_group'))
+        self.assertEqual(len(json.loads(response.content)['data']), 6)
+
+    def test_search_user_groups_by_name(self):
+        Participation.objects.create(match=self.match2, user=self.user1, message='')
+        self.client.login(username='chat_user1', password='chat123')
+        response = self.client.get(reverse('liveChat:operate_group'), {'group_name': 'TOURNAMENT'})
+        groups = json.loads(response.content)['data']
+        self.assertEqual([group['name'] for group in groups], ['Group Basketball Tournament'])
+
     def test_patch_group_name(self):
         """Test updating group name"""
         self.client.login(username='chat_user1', password='chat123')
@@ -370,4 +416,209 @@ class LiveChatMessageTestCase(TestCase):
         self.assertEqual(len(data['data']), 2)
         usernames = [chat['username'] for chat in data['data']]
         self.assertIn('msg_user1', usernames)
-        self.assertIn('msg_user2', usernames)
\ No newline at end of file
+        self.assertIn('msg_user2', usernames)
+
+    def _create_history(self, count):
+        chats = []
+        start = timezone.now() - timedelta(hours=1)
+        for i in range(count):
+            chat = Chat.objects.create(group_id=self.group, username=self.user1, message=f'Message {i}')
+            Chat.objects.filter(pk=chat.pk).update(createdAt=start + timedelta(minutes=i))
+            chat.refresh_from_db()
+            chats.append(chat)
+        return chats
+
+    def test_get_chats_since_returns_only_newer(self):
+        chats = self._create_history(5)
+        self.client.login(username='msg_user1', password='msg123')
+        response = self.client.get(
+            reverse('liveChat:operate_chat_by_group', kwargs={'group_id': self.group.id}),
+            {'since': chats[2].createdAt.isoformat()}
+        )
+        self.assertEqual(response.status_code, 200)
+        messages = [chat['message'] for chat in response.json()['data']]
+        self.assertEqual(messages, ['Message 4', 'Message 3'])
+
+    def test_get_chats_since_with_limit_skips_nothing(self):
+        chats = self._create_history(7)
+        self.client.login(username='msg_user1', password='msg123')
+        url = reverse('liveChat:operate_chat_by_group', kwargs={'group_id': self.group.id})
+
+        since, pages = chats[0].createdAt.isoformat(), []
+        while page := self.client.get(url, {'since': since, 'limit': 2}).json()['data']:
+            pages.append([chat['message'] for chat in page])
+            since = page[0]['createdAt']
+        self.assertEqual(pages, [
+            ['Message 2', 'Message 1'], ['Message 4', 'Message 3'], ['Message 6', 'Message 5'],
+        ])
+
+    def test_get_chats_before_with_limit_pages_backwards(self):
+        chats = self._create_history(5)
+        self.client.login(username='msg_user1', password='msg123')
+        response = self.client.get(
+            reverse('liveChat:operate_chat_by_group', kwargs={'group_id': self.group.id}),
+            {'before': chats[3].createdAt.isoformat(), 'limit': 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        messages = [chat['message'] for chat in response.json()['data']]
+        self.assertEqual(messages, ['Message 2', 'Message 1'])
+
+    @override_settings(PRESENCE_FLUSH_INTERVAL=3600)
+    def test_get_chats_query_count_does_not_grow_with_history(self):
+        Participation.objects.create(match=self.match, user=self.user2, message='')
+        self._create_history(3)
+        Chat.objects.create(group_id=self.group, username=self.user2, message='Other author')
+        self.client.login(username='msg_user1', password='msg123')
+        url = reverse('liveChat:operate_chat_by_group', kwargs={'group_id': self.group.id})
+        # session, user, group, membership, chats with authors
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()['data']), 4)
+
+    def test_get_chats_invalid_cursor(self):
+        self.client.login(username='msg_user1', password='msg123')
+        url = reverse('liveChat:operate_chat_by_group', kwargs={'group_id': self.group.id})
+        self.assertEqual(self.client.get(url, {'since': 'not-a-date'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': '-1'}).status_code, 400)
+
+class LiveChatPushTestCase(TestCase):
+    """Test cases for the chat stream, long-poll and pub/sub broker"""
+
+    def setUp(self):
+        self.user1 = CustomUser.objects.create_user(
+            username='push_user1',
+            password='push123',
+            role='user',
+            email='push1@test.com'
+        )
+        self.user2 = CustomUser.objects.create_user(
+            username='push_user2',
+            password='push123',
+            role='user',
+            email='push2@test.com'
+        )
+
+        self.category = SportCategory.objects.create(name='Voli')
+        self.match = Match.objects.create(
+            title='Voli Sore',
+            category=self.category,
+            location='GOR',
+            event_date=timezone.now() + timedelta(days=2),
+            max_members=12
+        )
+        self.group = Group.objects.create(match=self.match, name='Group Voli Sore')
+        Participation.objects.create(match=self.match, user=self.user1, message='')
+
+    async def test_in_process_broker_fans_out_to_group(self):
+        broker = InProcessBroker()
+        with broker.subscribe(self.group.id) as subscription, broker.subscribe(uuid.uuid4()) as other:
+            broker.publish(self.group.id, {'message': 'hi'})
+            self.assertEqual(await subscription.get(1), {'message': 'hi'})
+            self.assertIsNone(await other.get(0.05))
+        self.assertEqual(dict(broker._subscriptions), {})
+
+    def test_new_chat_is_published_on_commit(self):
+        with mock.patch.object(get_broker(), 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                Chat.objects.create(group_id=self.group, username=self.user1, message='Pushed')
+        group_id, payload = publish.call_args.args
+        self.assertEqual(group_id, self.group.id)
+        self.assertEqual(payload['message'], 'Pushed')
+        self.assertEqual(payload['username'], 'push_user1')
+
+    def test_poll_returns_chats_since_timestamp(self):
+        old = Chat.objects.create(group_id=self.group, username=self.user1, message='Old')
+        Chat.objects.create(group_id=self.group, username=self.user1, message='New')
+        self.client.login(username='push_user1', password='push123')
+        response = self.client.get(
+            reverse('liveChat:poll_chat_by_group', kwargs={'group_id': self.group.id}),
+            {'since': old.createdAt.isoformat()}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([chat['message'] for chat in response.json()['data']], ['New'])
+
+    @override_settings(LIVECHAT_LONG_POLL_TIMEOUT=0.05)
+    def test_poll_times_out_with_no_new_chats(self):
+        chat = Chat.objects.create(group_id=self.group, username=self.user1, message='Only')
+        self.client.login(username='push_user1', password='push123')
+        response = self.client.get(
+            reverse('liveChat:poll_chat_by_group', kwargs={'group_id': self.group.id}),
+            {'since': chat.createdAt.isoformat()}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'], [])
+
+    def test_poll_rejects_non_member(self):
+        self.client.login(username='push_user2', password='push123')
+        response = self.client.get(
+            reverse('liveChat:poll_chat_by_group', kwargs={'group_id': self.group.id})
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_poll_rejects_invalid_since(self):
+        self.client.login(username='push_user1', password='push123')
+        response = self.client.get(
+            reverse('liveChat:poll_chat_by_group', kwargs={'group_id': self.group.id}),
+            {'since': 'yesterday'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_is_off_unless_sse_transport(self):
+        self.client.login(username='push_user1', password='push123')
+        response = self.client.get(reverse('liveChat:stream_chat_by_group', kwargs={'group_id': self.group.id}))
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(reverse('liveChat:show_main'))
+        self.assertEqual(response.context['chat_transport'], 'poll')
+
+    @override_settings(LIVECHAT_POLL_INTERVAL=1, LIVECHAT_CLIENT_POLL_INTERVAL=5)
+    def test_browser_poll_interval_is_separate_from_broker(self):
+        self.client.login(username='push_user1', password='push123')
+        response = self.client.get(reverse('liveChat:show_main'))
+        self.assertEqual(response.context['chat_poll_interval'], 5)
+
+    @override_settings(LIVECHAT_TRANSPORT='sse')
+    async def test_stream_accepts_naive_since(self):
+        await self.async_client.aforce_login(self.user1)
+        response = await self.async_client.get(
+            reverse('liveChat:stream_chat_by_group', kwargs={'group_id': self.group.id}),
+            {'since': (timezone.now() - timedelta(minutes=1)).replace(tzinfo=None).isoformat()}
+        )
+        stream = response.streaming_content
+        await anext(stream)
+
+        get_broker().publish(self.group.id, {
+            'username': 'push_user1',
+            'message': 'Live',
+            'createdAt': timezone.now().isoformat(),
+            'profile_picture': '',
+        })
+        self.assertIn(b'"message": "Live"', await anext(stream))
+        await stream.aclose()
+
+    @override_settings(LIVECHAT_TRANSPORT='sse')
+    async def test_stream_replays_then_pushes_new_chats(self):
+        old = await Chat.objects.acreate(group_id=self.group, username=self.user1, message='Old')
+        await Chat.objects.acreate(group_id=self.group, username=self.user1, message='Missed')
+        await self.async_client.aforce_login(self.user1)
+        response = await self.async_client.get(
+            reverse('liveChat:stream_chat_by_group', kwargs={'group_id': self.group.id}),
+            {'since': old.createdAt.isoformat()}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        stream = response.streaming_content
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        self.assertIn(b'"message": "Missed"', await anext(stream))
+
+        get_broker().publish(self.group.id, {
+            'username': 'push_user1',
+            'message': 'Live',
+            'createdAt': timezone.now().isoformat(),
+            'profile_picture': '',
+        })
+        event = await anext(stream)
+        self.assertIn(b'event: chat', event)
+        self.assertIn(b'"message": "Live"', event)
+        await stream.aclose()
@@ -6,6 +6,8 @@ app_name = 'liveChat'
 urlpatterns = [
     path('', show_main, name='show_main'),
     path('chat/<uuid:group_id>/', operate_chat_by_group, name='operate_chat_by_group'),
+    path('chat/<uuid:group_id>/stream/', stream_chat_by_group, name='stream_chat_by_group'),
+    path('chat/<uuid:group_id>/poll/', poll_chat_by_group, name='poll_chat_by_group'),
     path('group/', operate_group, name='operate_group'),
     path('group/<uuid:group_id>/', operate_group, name='operate_group')
 ]
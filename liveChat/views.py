@@ -1,16 +1,34 @@
 from django.shortcuts import render, get_object_or_404
 from .models import Group, Chat
-from django.core import serializers
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from .pubsub import get_broker
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views import View
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
 from django.forms.models import model_to_dict
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from asgiref.sync import sync_to_async
 from accounts.models import CustomUser
+from matches.models import Participation
+from sosmed_PBPF08 import streaming
 from .forms import *
+from collections import defaultdict
+from datetime import datetime
 import uuid
 import json
 
+CHAT_MAX_PAGE_SIZE = 200
+CHAT_TRANSPORTS = ("poll", "long-poll", "sse")
+
+
+def _chat_transport():
+    transport = getattr(settings, "LIVECHAT_TRANSPORT", "poll")
+    return transport if transport in CHAT_TRANSPORTS else "poll"
+
 # Create your views here.
 @login_required
 def show_main(request: HttpRequest):
@@ -18,6 +36,8 @@ def show_main(request: HttpRequest):
     return render(request, 'main_livechat.html', {
         "username": request.user.username,
         "profile_picture": request.user.profile_picture.url if request.user.profile_picture else "https://cdn-icons-png.flaticon.com/512/847/847969.png",
+        "chat_transport": _chat_transport(),
+        "chat_poll_interval": getattr(settings, "LIVECHAT_CLIENT_POLL_INTERVAL", 5),
     })
 
 @login_required
@@ -42,40 +62,56 @@ def operate_group_get(request: HttpRequest, group_id: uuid):
         data = model_to_dict(group)
         data["members"] = group.users
         return JsonResponse({"data": data}, status=200)
-    elif user.role != 'admin' and search_name:
-        user_participations = user.participations.all()
-        data = []
-        for user_participation in user_participations:
-            match = user_participation.match
-            group = match.group
-            if group.name.lower().count(search_name):
-                group_dict = model_to_dict(group)
-                group_dict["members"] = group.users
-                group_dict["last_chat"] = group.last_chat
-                print(group_dict)
-                data.append(group_dict)
-        return JsonResponse({"data": data}, status=200)
     elif user.role != 'admin':
-        user_participations = user.participations.all()
-        data = []
-        for user_participation in user_participations:
-            match = user_participation.match
-            group = match.group
-            group_dict = model_to_dict(group)
-            group_dict["members"] = group.users
-            group_dict["last_chat"] = group.last_chat
-            print(group_dict)
-            data.append(group_dict)
-        return JsonResponse({"data": data}, status=200)
+        return JsonResponse({"data": _build_inbox(user, search_name)}, status=200)
     elif group_id:
         group = get_object_or_404(Group, id=group_id)
         data = model_to_dict(group)
         data["members"] = group.users
         return JsonResponse({"data": data}, status=200)
     else:
-        group = Group.objects.all()
-        data = serializers.serialize("json", group)
-        return JsonResponse({"data": json.loads(data)}, status=200)
+        return streaming.stream_json(request, {"data": Group.objects.all()})
+
+def _build_inbox(user: CustomUser, search_name: str = ""):
+    """
+    The user's groups, most recently joined first, in two queries: one for
+    the groups with their latest chat annotated, one for all their members.
+    """
+    latest_chat = Chat.objects.filter(group_id=OuterRef("pk")).order_by("-createdAt")
+    groups = (
+        Group.objects.filter(match__participations__user=user)
+        .annotate(
+            joined_at=F("match__participations__created_at"),
+            last_chat_username=Subquery(latest_chat.values("username")[:1]),
+            last_chat_message=Subquery(latest_chat.values("message")[:1]),
+            last_chat_created_at=Subquery(latest_chat.values("createdAt")[:1]),
+        )
+        .order_by("-joined_at")
+    )
+    if search_name:
+        groups = groups.filter(name__icontains=search_name)
+    groups = list(groups)
+
+    members = defaultdict(list)
+    participations = (
+        Participation.objects.filter(match_id__in={group.match_id for group in groups})
+        .order_by("-created_at")
+        .values_list("match_id", "user")
+    )
+    for match_id, username in participations:
+        members[match_id].append(username)
+
+    data = []
+    for group in groups:
+        group_dict = model_to_dict(group)
+        group_dict["members"] = members[group.match_id]
+        group_dict["last_chat"] = {
+            "username": group.last_chat_username,
+            "message": group.last_chat_message,
+            "createdAt": group.last_chat_created_at,
+        } if group.last_chat_created_at else None
+        data.append(group_dict)
+    return data
 
 def operate_group_patch(request: HttpRequest, group_id: uuid):
     data = json.loads(request.body)
@@ -100,7 +136,7 @@ def operate_chat_by_group(request: HttpRequest, group_id: uuid):
     print("here 2")
     match request.method:
         case "GET":
-            return operate_chat_by_group_get(request.user, group_id)
+            return operate_chat_by_group_get(request, group_id)
         case "POST":
             return operate_chat_by_group_post(request, group_id)
         case "DELETE":
@@ -108,21 +144,42 @@ def operate_chat_by_group(request: HttpRequest, group_id: uuid):
         case _: 
             return HttpResponse(status=405)
 
-def operate_chat_by_group_get(user: CustomUser, group_id: uuid):
+def operate_chat_by_group_get(request: HttpRequest, group_id: uuid):
+    """
+    Chats of a group, newest first.
+
+    ``?since=<createdAt>`` returns only chats newer than the given one (with
+    ``&limit=N``, the N oldest of those, so polling from the newest chat
+    returned catches up page by page);
+    ``?before=<createdAt>&limit=N`` pages backwards through older history.
+    Without parameters the whole history is returned.
+    """
+    user = request.user
     group = get_object_or_404(Group, id=group_id)
-    if user.role != 'admin' and not group.users.count(user.pk): 
+    if not _can_access_group(user, group):
         return HttpResponse(status=401)
-    chats = list(group.chat.all().values("username", "message", "createdAt"))
-    for chat in chats:
-        user = CustomUser.objects.get(username=chat["username"])
-        chat["profile_picture"] = user.profile_picture.url if user.profile_picture else "https://cdn-icons-png.flaticon.com/512/847/847969.png"
+
+    cursors = {}
+    for name in ("since", "before"):
+        if request.GET.get(name):
+            cursors[name] = _parse_timestamp(request.GET[name])
+            if cursors[name] is None:
+                return JsonResponse({"errors": {name: ["Invalid timestamp."]}}, status=400)
+
+    limit = request.GET.get("limit")
+    if limit is not None:
+        if not limit.isdigit() or int(limit) == 0:
+            return JsonResponse({"errors": {"limit": ["Limit must be a positive integer."]}}, status=400)
+        limit = min(int(limit), CHAT_MAX_PAGE_SIZE)
+
+    chats = _chat_page(group_id, limit=limit, **cursors)
     return JsonResponse({"data": chats}, status=200)
 
 def operate_chat_by_group_post(request: HttpRequest, group_id: uuid):
     data = json.loads(request.body)
     user = request.user
     group = get_object_or_404(Group, id=group_id)
-    if user.role != 'admin' and not group.users.count(user.pk): 
+    if not _can_access_group(user, group):
         return HttpResponse(status=401)
     chat = ChatForm({
         "group_id": group_id,
@@ -138,4 +195,123 @@ def operate_chat_by_group_delete(user: CustomUser, group_id: uuid):
     if user.role == 'admin':
         Chat.objects.filter(group_id=group_id).delete()
         return HttpResponse(status=204)
-    return HttpResponse(status=401)
\ No newline at end of file
+    return HttpResponse(status=401)
+
+
+def _can_access_group(user: CustomUser, group: Group) -> bool:
+    return user.role == 'admin' or Participation.objects.filter(match_id=group.match_id, user=user).exists()
+
+def _parse_timestamp(value: str):
+    """
+    Parse a ``createdAt`` cursor; a literal '+' arrives as a space when the client didn't URL-encode it.
+    A cursor without an offset is taken to be in the current time zone, so it compares with stored times.
+    """
+    try:
+        parsed = parse_datetime(value.replace(" ", "+"))
+    except ValueError:
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+def _load_group_for(user: CustomUser, group_id: uuid):
+    group = get_object_or_404(Group, id=group_id)
+    return group, _can_access_group(user, group)
+
+def _chat_page(group_id: uuid, since: datetime = None, before: datetime = None, limit: int = None):
+    """
+    Serialize a group's chats newest first, with the authors joined in the same query.
+
+    With ``since`` the ``limit`` chats right after it are returned, not the
+    newest ones, so a client moving its cursor to the newest chat it got
+    skips nothing.
+    """
+    chats = Chat.objects.filter(group_id=group_id).select_related("username")
+    if since:
+        chats = chats.filter(createdAt__gt=since).order_by("createdAt")
+    else:
+        chats = chats.order_by("-createdAt")
+    if before:
+        chats = chats.filter(createdAt__lt=before)
+    if limit:
+        chats = chats[:limit]
+    chats = [chat.to_dict() for chat in chats]
+    return chats[::-1] if since else chats
+
+async def _authorize_chat_request(request: HttpRequest, group_id: uuid):
+    """Return ``(since, None)`` when the request may read the group, else ``(None, error_response)``."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None, HttpResponse(status=401)
+    _, allowed = await sync_to_async(_load_group_for)(user, group_id)
+    if not allowed:
+        return None, HttpResponse(status=401)
+
+    since = request.GET.get("since") or request.headers.get("Last-Event-ID")
+    if not since:
+        return None, None
+    since = _parse_timestamp(since)
+    if since is None:
+        return None, JsonResponse({"errors": {"since": ["Invalid timestamp."]}}, status=400)
+    return since, None
+
+def _sse_event(chat: dict) -> str:
+    return f"id: {chat['createdAt']}\nevent: chat\ndata: {json.dumps(chat)}\n\n"
+
+async def _chat_event_stream(group_id: uuid, since: datetime):
+    heartbeat = getattr(settings, "LIVECHAT_STREAM_HEARTBEAT", 15)
+    last_sent = since
+    with get_broker().subscribe(group_id) as subscription:
+        yield "retry: 3000\n\n"
+        if since:
+            for chat in reversed(await sync_to_async(_chat_page)(group_id, since)):
+                yield _sse_event(chat)
+                last_sent = datetime.fromisoformat(chat["createdAt"])
+        while True:
+            chat = await subscription.get(heartbeat)
+            if chat is None:
+                yield ": keep-alive\n\n"
+                continue
+            created_at = datetime.fromisoformat(chat["createdAt"])
+            if last_sent and created_at <= last_sent:
+                continue
+            yield _sse_event(chat)
+            last_sent = created_at
+
+@require_GET
+async def stream_chat_by_group(request: HttpRequest, group_id: uuid):
+    """
+    Server-Sent Events stream of new chats in a group.
+
+    Replays chats newer than ``?since=`` (or the ``Last-Event-ID`` sent by a
+    reconnecting EventSource) and then pushes each new chat as it is posted.
+    Only served when LIVECHAT_TRANSPORT is "sse", since it needs an ASGI
+    server to hold connections open.
+    """
+    if _chat_transport() != "sse":
+        return HttpResponse(status=404)
+    since, error = await _authorize_chat_request(request, group_id)
+    if error:
+        return error
+    response = StreamingHttpResponse(_chat_event_stream(group_id, since), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+@require_GET
+async def poll_chat_by_group(request: HttpRequest, group_id: uuid):
+    """
+    Long-poll fallback for clients without EventSource.
+
+    Returns chats newer than ``?since=`` right away if there are any, otherwise
+    waits up to LIVECHAT_LONG_POLL_TIMEOUT seconds for the next one.
+    """
+    since, error = await _authorize_chat_request(request, group_id)
+    if error:
+        return error
+    timeout = getattr(settings, "LIVECHAT_LONG_POLL_TIMEOUT", 25)
+    with get_broker().subscribe(group_id) as subscription:
+        chats = await sync_to_async(_chat_page)(group_id, since)
+        if not chats and since and await subscription.get(timeout) is not None:
+            chats = await sync_to_async(_chat_page)(group_id, since)
+    return JsonResponse({"data": chats}, status=200)
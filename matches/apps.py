@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class MatchesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "matches"
+
+    def ready(self):
+        from . import schema, search, signals  # noqa: F401
+
+        post_migrate.connect(schema.reset, sender=self)
+        post_migrate.connect(search.reset, sender=self)
+        post_migrate.connect(search.repair_sqlite_index, sender=self)
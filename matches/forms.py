@@ -1,19 +1,13 @@
 from django import forms
-from django.db import connection
-from django.db.utils import OperationalError, ProgrammingError
 
+from . import schema
 from .models import Match, Participation, SportCategory
 
 
 def _is_category_table_ready() -> bool:
     """Return True when the sport category table is available."""
 
-    try:
-        existing_tables = set(connection.introspection.table_names())
-    except (OperationalError, ProgrammingError):
-        return False
-
-    return SportCategory._meta.db_table in existing_tables
+    return schema.tables_exist(SportCategory)
 
 
 class MatchForm(forms.ModelForm):
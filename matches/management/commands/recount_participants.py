@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from matches.models import Match, Participation
+
+
+def actual_participant_count():
+    counts = (
+        Participation.objects.filter(match=OuterRef("pk"))
+        .order_by()
+        .values("match")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recompute Match.participant_count from the participation table'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stale = list(
+                Match.objects.select_for_update()
+                .annotate(actual=actual_participant_count())
+                .exclude(participant_count=F("actual"))
+                .values_list("pk", "participant_count", "actual")
+            )
+            for pk, stored, actual in stale:
+                self.stdout.write(f'Match {pk}: {stored} -> {actual}')
+            Match.objects.filter(pk__in=[pk for pk, _, _ in stale]).update(
+                participant_count=actual_participant_count()
+            )
+        self.stdout.write(self.style.SUCCESS(f'Repaired {len(stale)} match(es).'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from matches import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the match dashboard sidebar statistics snapshot (run from cron to keep it warm)'
+
+    def handle(self, *args, **options):
+        snapshot = stats.refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f"Dashboard stats refreshed: {snapshot['total_matches']} match(es), "
+            f"{snapshot['total_players']} player(s), {snapshot['players_online']} online."
+        ))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_participants(apps, schema_editor):
+    Match = apps.get_model('matches', 'Match')
+    Participation = apps.get_model('matches', 'Participation')
+    counts = (
+        Participation.objects.filter(match=OuterRef('pk'))
+        .order_by()
+        .values('match')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Match.objects.update(participant_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='participant_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_existing_participants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_participations(apps, schema_editor):
+    Match = apps.get_model('matches', 'Match')
+    Participation = apps.get_model('matches', 'Participation')
+    duplicates = (
+        Participation.objects.order_by()
+        .values('match', 'user')
+        .annotate(total=Count('pk'))
+        .filter(total__gt=1)
+    )
+    affected = set()
+    for row in duplicates:
+        rows = Participation.objects.filter(match=row['match'], user=row['user']).order_by('created_at', 'pk')
+        keep = rows.values_list('pk', flat=True).first()
+        rows.exclude(pk=keep).delete()
+        affected.add(row['match'])
+
+    if affected:
+        counts = (
+            Participation.objects.filter(match=OuterRef('pk'))
+            .order_by()
+            .values('match')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        Match.objects.filter(pk__in=affected).update(participant_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0002_match_participant_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_participations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='participation',
+            constraint=models.UniqueConstraint(fields=('match', 'user'), name='unique_participation_per_match'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:02
+
+from django.db import migrations
+
+from matches import search
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        search.install_sqlite_index(schema_editor.connection)
+    elif schema_editor.connection.vendor == 'postgresql':
+        search.install_trigram_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        search.uninstall_sqlite_index(schema_editor.connection)
+    elif schema_editor.connection.vendor == 'postgresql':
+        search.uninstall_trigram_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0003_unique_participation_per_match'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0005_match_category_date_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='participation',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='participation_history_idx'),
+        ),
+    ]
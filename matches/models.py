@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.text import slugify
 from accounts.models import CustomUser
 import uuid
@@ -28,17 +28,24 @@ class Match(models.Model):
     event_date = models.DateTimeField()
     description = models.TextField(blank=True)
     max_members = models.PositiveIntegerField()
+    # Kept in step with Participation rows by matches.signals; repair with
+    # `manage.py recount_participants` after writes that skip signals.
+    participant_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["event_date"]
+        indexes = [
+            # Serves the per-category window in match_dashboard.
+            models.Index(fields=["category", "event_date", "id"], name="match_category_date_idx"),
+        ]
 
     def __str__(self) -> str:  
         return self.title
 
     @property
     def current_members(self) -> int:
-        return self.participations.count()
+        return self.participant_count
 
     @property
     def available_slots(self) -> int:
@@ -54,6 +61,18 @@ class Participation(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["match", "user"], name="unique_participation_per_match"),
+        ]
+        indexes = [
+            # A user's participation history, newest first (CustomUser.participation_history).
+            models.Index(fields=["user", "-created_at", "-id"], name="participation_history_idx"),
+        ]
 
     def __str__(self) -> str:  
-        return f"{self.user.username} - {self.match.id}"
\ No newline at end of file
+        return f"{self.user.username} - {self.match.id}"
+
+    def save(self, *args, **kwargs):
+        # The post_save receiver bumps Match.participant_count; commit both together.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""
+Process-wide answers to "are the match tables there yet?".
+
+Checking with ``connection.introspection`` costs a catalog query, so a
+positive answer is remembered until the next ``migrate`` (see
+MatchesConfig.ready). A negative answer is never cached, so a fresh
+database starts working as soon as it has been migrated.
+"""
+from django.db import connection
+from django.db.utils import OperationalError, ProgrammingError
+from django.utils.text import slugify
+
+DEFAULT_CATEGORIES = [
+    "Sepak Bola", "Basket", "Bulu Tangkis", "Futsal", "Lari", "Bersepeda", "Other"
+]
+
+_known_tables = set()
+_default_categories_seeded = False
+
+
+def tables_exist(*models) -> bool:
+    return table_names_exist(*(model._meta.db_table for model in models))
+
+
+def table_names_exist(*names) -> bool:
+    required_tables = set(names)
+    if required_tables.issubset(_known_tables):
+        return True
+
+    try:
+        existing_tables = set(connection.introspection.table_names())
+    except (OperationalError, ProgrammingError):
+        return False
+
+    _known_tables.update(existing_tables)
+    return required_tables.issubset(existing_tables)
+
+
+def ensure_default_categories() -> None:
+    """Insert any missing default categories, once per process, in one query."""
+    global _default_categories_seeded
+    from .models import SportCategory
+
+    if _default_categories_seeded or not tables_exist(SportCategory):
+        return
+
+    SportCategory.objects.bulk_create(
+        [SportCategory(name=name, slug=slugify(name)) for name in DEFAULT_CATEGORIES],
+        ignore_conflicts=True,
+    )
+    _default_categories_seeded = True
+
+
+def reset(**kwargs) -> None:
+    """Forget cached answers; connected to ``post_migrate``."""
+    global _default_categories_seeded
+    _known_tables.clear()
+    _default_categories_seeded = False
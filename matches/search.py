@@ -0,0 +1,218 @@
+"""
+Keyword search over ``Match.title``, ``description`` and ``location``.
+
+``search_matches(keyword, queryset)`` narrows a queryset to matches containing
+``keyword`` and orders them best-first; the rank is exposed as
+``search_rank``. Which index answers the query depends on the database:
+
+- SQLite: the ``matches_match_fts`` FTS5 table (trigram tokenizer, so any
+  substring of 3+ characters matches, like ``icontains``), keyed by the match
+  row's rowid. Triggers keep it in step with every insert, update and delete.
+- PostgreSQL: a pg_trgm GIN index over ``title || ' ' || description || ' ' ||
+  location``, queried with ILIKE and ranked with ``word_similarity``.
+  PostgreSQL maintains the index itself.
+- Anything else, a keyword shorter than the trigram size, or a database
+  where the index could not be created: plain ``icontains``, unranked.
+"""
+from django.db import connection, connections, transaction
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.utils import DatabaseError
+
+from . import schema
+
+FTS_TABLE = "matches_match_fts"
+FTS_TRIGGERS = ("matches_match_fts_ai", "matches_match_fts_ad", "matches_match_fts_au")
+TRIGRAM_INDEX = "match_search_trgm_idx"
+SEARCH_DOCUMENT_SQL = "(\"matches_match\".\"title\" || ' ' || \"matches_match\".\"description\" || ' ' || \"matches_match\".\"location\")"
+MIN_INDEXED_LENGTH = 3
+
+SQLITE_INDEX_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(title, description, location, tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS matches_match_fts_ai AFTER INSERT ON matches_match BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+        VALUES (new.rowid, new.title, new.description, new.location);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS matches_match_fts_ad AFTER DELETE ON matches_match BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.rowid;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS matches_match_fts_au AFTER UPDATE OF title, description, location ON matches_match BEGIN
+        UPDATE {FTS_TABLE} SET title = new.title, description = new.description, location = new.location
+        WHERE rowid = old.rowid;
+    END""",
+]
+
+_trigram_ready = False
+
+
+def install_sqlite_index(db) -> None:
+    """
+    Create the FTS table and triggers if missing, and rebuild the table when they were.
+    Leave search on icontains if this SQLite lacks FTS5 or the trigram tokenizer (< 3.34).
+    """
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+            FTS_TRIGGERS,
+        )
+        if cursor.fetchone()[0] == len(FTS_TRIGGERS):
+            return
+
+    # Rebuilding matches_match (e.g. for an AlterField) drops its triggers
+    # and renumbers rows, so the index can't be trusted once they are gone.
+    try:
+        with transaction.atomic(using=db.alias), db.cursor() as cursor:
+            for statement in SQLITE_INDEX_SQL:
+                cursor.execute(statement)
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, title, description, location) "
+                "SELECT rowid, title, description, location FROM matches_match"
+            )
+    except DatabaseError:
+        return
+
+
+def uninstall_sqlite_index(db) -> None:
+    with db.cursor() as cursor:
+        for trigger in FTS_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def install_trigram_index(db) -> None:
+    """Create pg_trgm and the GIN index; leave search on icontains if that isn't allowed."""
+    try:
+        with transaction.atomic(using=db.alias), db.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError:
+        return
+    with db.cursor() as cursor:
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON matches_match "
+            "USING gin ((title || ' ' || description || ' ' || location) gin_trgm_ops)"
+        )
+
+
+def uninstall_trigram_index(db) -> None:
+    with db.cursor() as cursor:
+        cursor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+
+
+def _escape_like(keyword: str) -> str:
+    return keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _ordering(queryset):
+    return queryset.query.order_by or queryset.model._meta.ordering
+
+
+class ContainsBackend:
+    """Unindexed fallback; keeps the caller's ordering."""
+
+    def search(self, queryset, keyword):
+        return queryset.filter(
+            Q(title__icontains=keyword)
+            | Q(description__icontains=keyword)
+            | Q(location__icontains=keyword)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class SQLiteFTSBackend(ContainsBackend):
+    # bm25() column weights: title, description, location.
+    WEIGHTS = "10.0, 1.0, 4.0"
+
+    def search(self, queryset, keyword):
+        if len(keyword) < MIN_INDEXED_LENGTH:
+            return super().search(queryset, keyword)
+
+        # Quote the keyword as one FTS5 string so it is matched as a substring.
+        query = '"%s"' % keyword.replace('"', '""')
+        return (
+            queryset.filter(
+                RawSQL(
+                    f"\"matches_match\".rowid IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)",
+                    (query,),
+                    output_field=BooleanField(),
+                )
+            )
+            .annotate(
+                # bm25() is negative and lower is better; flip it so higher ranks first.
+                search_rank=RawSQL(
+                    f"SELECT -bm25({FTS_TABLE}, {self.WEIGHTS}) FROM {FTS_TABLE} "
+                    f"WHERE {FTS_TABLE} MATCH %s AND rowid = \"matches_match\".rowid",
+                    (query,),
+                    output_field=FloatField(),
+                )
+            )
+            .order_by("-search_rank", *_ordering(queryset))
+        )
+
+
+class PostgresTrigramBackend(ContainsBackend):
+    def search(self, queryset, keyword):
+        if len(keyword) < MIN_INDEXED_LENGTH:
+            return super().search(queryset, keyword)
+
+        return (
+            queryset.filter(
+                RawSQL(
+                    f"{SEARCH_DOCUMENT_SQL} ILIKE %s",
+                    (f"%{_escape_like(keyword)}%",),
+                    output_field=BooleanField(),
+                )
+            )
+            .annotate(
+                search_rank=RawSQL(
+                    f"word_similarity(%s, {SEARCH_DOCUMENT_SQL})",
+                    (keyword,),
+                    output_field=FloatField(),
+                )
+            )
+            .order_by("-search_rank", *_ordering(queryset))
+        )
+
+
+def _trigram_index_exists() -> bool:
+    global _trigram_ready
+    if _trigram_ready:
+        return True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", [TRIGRAM_INDEX])
+            _trigram_ready = cursor.fetchone() is not None
+    except DatabaseError:
+        return False
+    return _trigram_ready
+
+
+def get_backend():
+    if connection.vendor == "sqlite" and schema.table_names_exist(FTS_TABLE):
+        return SQLiteFTSBackend()
+    if connection.vendor == "postgresql" and _trigram_index_exists():
+        return PostgresTrigramBackend()
+    return ContainsBackend()
+
+
+def search_matches(keyword, queryset=None):
+    """Matches in ``queryset`` (default: all) containing ``keyword``, best match first."""
+    from .models import Match
+
+    if queryset is None:
+        queryset = Match.objects.all()
+    keyword = keyword.strip()
+    if not keyword:
+        return queryset
+    return get_backend().search(queryset, keyword)
+
+
+def repair_sqlite_index(using="default", **kwargs) -> None:
+    """post_migrate hook: put the FTS triggers back if a table rebuild dropped them."""
+    db = connections[using]
+    if db.vendor == "sqlite" and FTS_TABLE in db.introspection.table_names():
+        install_sqlite_index(db)
+
+
+def reset(**kwargs) -> None:
+    global _trigram_ready
+    _trigram_ready = False
@@ -0,0 +1,51 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from sosmed_PBPF08 import response_cache
+
+from . import stats
+from .models import Match, Participation, SportCategory
+
+
+def _adjust_participant_count(participation: Participation, delta: int) -> None:
+    matches = Match.objects.filter(pk=participation.match_id)
+    if delta < 0:
+        matches = matches.filter(participant_count__gt=0)
+    matches.update(participant_count=F("participant_count") + delta)
+
+    # Keep an already loaded match in step so callers don't need a refresh.
+    if Participation._meta.get_field("match").is_cached(participation):
+        match = participation.match
+        match.participant_count = max(match.participant_count + delta, 0)
+
+
+@receiver(post_save, sender=Participation)
+def count_new_participant(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _adjust_participant_count(instance, 1)
+
+
+@receiver(post_delete, sender=Participation)
+def count_removed_participant(sender, instance, **kwargs):
+    _adjust_participant_count(instance, -1)
+
+
+# Participation signals run after the participant_count update above, which
+# goes through QuerySet.update() and so does not fire Match signals itself.
+@receiver(post_save, sender=Match)
+@receiver(post_delete, sender=Match)
+@receiver(post_save, sender=Participation)
+@receiver(post_delete, sender=Participation)
+@receiver(post_save, sender=SportCategory)
+@receiver(post_delete, sender=SportCategory)
+def refresh_match_responses(sender, **kwargs):
+    response_cache.bump("matches")
+
+
+@receiver(post_save, sender=Match)
+@receiver(post_delete, sender=Match)
+@receiver(post_save, sender=SportCategory)
+@receiver(post_delete, sender=SportCategory)
+def refresh_dashboard_stats(sender, **kwargs):
+    stats.mark_stale()
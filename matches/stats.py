@@ -0,0 +1,89 @@
+"""
+Snapshot of the sidebar statistics shown on the match dashboard.
+
+The eight numbers and lists are computed together and stored in the cache
+as one value, so a dashboard render reads them with a single cache hit. A
+snapshot older than DASHBOARD_STATS_MAX_AGE seconds (or from an earlier day)
+is refreshed by the first request that sees it, while concurrent requests
+keep serving the old one; ``refresh_dashboard_stats`` can run the refresh on
+a schedule instead so no request ever pays for it.
+
+Participations change too often to recompute on every write and are only
+bounded by the max age. Creating or deleting a match or a category marks the
+snapshot stale (see matches.signals) so those show up on the next render.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from accounts import presence
+
+from .models import Match, Participation, SportCategory
+
+SNAPSHOT_KEY = "matches:dashboard_stats"
+REFRESH_LOCK_KEY = "matches:dashboard_stats:refreshing"
+REFRESH_LOCK_TIMEOUT = 30
+DEFAULT_MAX_AGE = 60
+
+
+def _max_age():
+    return getattr(settings, "DASHBOARD_STATS_MAX_AGE", DEFAULT_MAX_AGE)
+
+
+def compute(now=None) -> dict:
+    now = now or timezone.now()
+    today = now.date()
+    return {
+        "computed_at": now,
+        "total_matches": Match.objects.count(),
+        "today_matches": Match.objects.filter(event_date__date=today).count(),
+        "total_players": Participation.objects.values("user").distinct().count(),
+        "sports_count": SportCategory.objects.count(),
+        "players_online": presence.online_count(now),
+        "players_active_today": presence.active_today_count(now),
+        "popular_sports": list(
+            SportCategory.objects.annotate(match_count=Count("matches"))
+            .order_by("-match_count")[:3]
+        ),
+        "recent_activity": list(
+            Match.objects.select_related("category").order_by("-created_at", "-id")[:5]
+        ),
+    }
+
+
+def refresh(now=None) -> dict:
+    snapshot = compute(now)
+    cache.set(SNAPSHOT_KEY, snapshot, timeout=None)
+    return snapshot
+
+
+def is_stale(snapshot, now) -> bool:
+    computed_at = snapshot["computed_at"]
+    return (
+        computed_at is None
+        or computed_at.date() != now.date()
+        or (now - computed_at).total_seconds() > _max_age()
+    )
+
+
+def get_snapshot(now=None) -> dict:
+    """The current snapshot, refreshed first if it is missing or stale."""
+    now = now or timezone.now()
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None:
+        return refresh(now)
+    if is_stale(snapshot, now) and cache.add(REFRESH_LOCK_KEY, True, timeout=REFRESH_LOCK_TIMEOUT):
+        try:
+            return refresh(now)
+        finally:
+            cache.delete(REFRESH_LOCK_KEY)
+    return snapshot
+
+
+def mark_stale(**kwargs):
+    """Have the next read refresh the snapshot; the old one is served until then."""
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is not None:
+        snapshot["computed_at"] = None
+        cache.set(SNAPSHOT_KEY, snapshot, timeout=None)
@@ -1,11 +1,22 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client
+from django.db import IntegrityError, connection, transaction
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from datetime import timedelta
 from django.http import JsonResponse
+from django.core import serializers
+from django.core.cache import cache
+from django.core.management import call_command
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+import unittest
 import uuid
+from unittest import mock
 
+from . import schema, search, stats
 from .models import SportCategory, Match, Participation
 from .forms import MatchForm, ParticipationForm, MatchSearchForm
 
@@ -42,6 +53,58 @@ class MatchModelTest(TestCase):
         self.assertEqual(self.match.available_slots, 9)
 
 
+class ParticipantCounterTest(TestCase):
+    def setUp(self):
+        self.category = SportCategory.objects.create(name="Tenis")
+        self.match = Match.objects.create(
+            title="Ganda Campuran",
+            category=self.category,
+            location="Lapangan Tenis",
+            event_date=timezone.now() + timedelta(days=2),
+            max_members=4,
+        )
+        self.users = [CustomUser.objects.create(username=f"tenis{i}") for i in range(3)]
+
+    def test_counter_follows_create_and_delete(self):
+        participations = [
+            Participation.objects.create(match=self.match, user=user) for user in self.users
+        ]
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.participant_count, 3)
+
+        participations[0].delete()
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.participant_count, 2)
+        self.assertEqual(self.match.available_slots, 2)
+
+    def test_counter_follows_cascade_delete(self):
+        for user in self.users:
+            Participation.objects.create(match=self.match, user=user)
+        CustomUser.objects.filter(username__in=["tenis0", "tenis1"]).delete()
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.participant_count, 1)
+
+    def test_current_members_needs_no_query(self):
+        Participation.objects.create(match=self.match, user=self.users[0])
+        match = Match.objects.get(pk=self.match.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(match.current_members, 1)
+            self.assertEqual(match.available_slots, 3)
+
+    def test_recount_command_repairs_drift(self):
+        Participation.objects.bulk_create(
+            [Participation(match=self.match, user=user) for user in self.users]
+        )
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.participant_count, 0)
+
+        out = StringIO()
+        call_command("recount_participants", stdout=out)
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.participant_count, 3)
+        self.assertIn("Repaired 1 match(es).", out.getvalue())
+
+
 class ParticipationModelTest(TestCase):
     def setUp(self):
         self.category = SportCategory.objects.create(name="Futsal")
@@ -59,8 +122,246 @@ class ParticipationModelTest(TestCase):
         self.assertIn(self.user.username, str(participation))
         self.assertIn(str(self.match.pk), str(participation))
 
+    def test_user_can_join_a_match_only_once(self):
+        Participation.objects.create(match=self.match, user=self.user)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Participation.objects.create(match=self.match, user=self.user)
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.participant_count, 1)
+
+
+class SchemaCacheTest(TestCase):
+    def setUp(self):
+        schema.reset()
+
+    def tearDown(self):
+        schema.reset()
+
+    def test_table_check_is_cached_after_success(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(schema.tables_exist(SportCategory, Match, Participation))
+        with self.assertNumQueries(0):
+            self.assertTrue(schema.tables_exist(SportCategory, Match, Participation))
+            self.assertTrue(schema.tables_exist(SportCategory))
+
+    def test_default_categories_seeded_once(self):
+        SportCategory.objects.create(name="Futsal")
+        schema.tables_exist(SportCategory)
+        with self.assertNumQueries(1):
+            schema.ensure_default_categories()
+        with self.assertNumQueries(0):
+            schema.ensure_default_categories()
+        self.assertEqual(
+            set(SportCategory.objects.values_list("name", flat=True)),
+            set(schema.DEFAULT_CATEGORIES),
+        )
+        self.assertEqual(SportCategory.objects.get(name="Bulu Tangkis").slug, "bulu-tangkis")
+
 
 # ======================== FORM TESTS ========================
+class MatchSearchTest(TestCase):
+    def setUp(self):
+        self.category = SportCategory.objects.create(name="Futsal")
+
+        def make(title, location="Jakarta", description=""):
+            return Match.objects.create(
+                title=title,
+                category=self.category,
+                location=location,
+                description=description,
+                event_date=timezone.now() + timedelta(days=1),
+                max_members=10,
+            )
+
+        self.in_title = make("Futsal Depok Malam", location="GOR Kukusan")
+        self.in_description = make("Sparring Santai", description="Kumpul di Depok jam 7")
+        self.unrelated = make("Basket Pagi", location="Senayan")
+
+    def test_search_is_ranked_and_substring_based(self):
+        results = list(search.search_matches("depok"))
+        self.assertEqual(results, [self.in_title, self.in_description])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+        self.assertEqual(list(search.search_matches("ukusa")), [self.in_title])
+
+    def test_index_follows_update_and_delete(self):
+        self.in_title.title = "Futsal Bogor"
+        self.in_title.save()
+        self.assertEqual(list(search.search_matches("depok")), [self.in_description])
+        self.assertEqual(list(search.search_matches("bogor")), [self.in_title])
+
+        self.in_description.delete()
+        self.assertEqual(list(search.search_matches("depok")), [])
+
+    def test_short_keyword_falls_back_to_contains(self):
+        self.assertEqual(set(search.search_matches("gi")), {self.unrelated})
+
+    def test_search_composes_with_other_filters(self):
+        queryset = Match.objects.filter(location="GOR Kukusan")
+        self.assertEqual(list(search.search_matches("depok", queryset)), [self.in_title])
+
+    def test_search_endpoint(self):
+        response = self.client.get(reverse("matches:search_match"), {"q": "depok", "limit": 1})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["data"]
+        self.assertEqual([item["title"] for item in data], ["Futsal Depok Malam"])
+        self.assertIn("rank", data[0])
+
+        response = self.client.get(reverse("matches:search_match"), {"q": ""})
+        self.assertEqual(response.status_code, 400)
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "SQLite FTS index")
+    def test_repair_restores_dropped_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER matches_match_fts_ai")
+        stray = Match.objects.create(
+            title="Depok Open", category=self.category, location="UI",
+            event_date=timezone.now(), max_members=2,
+        )
+        self.assertNotIn(stray, search.search_matches("depok"))
+
+        search.repair_sqlite_index()
+        self.assertIn(stray, search.search_matches("depok"))
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "SQLite FTS index")
+    def test_missing_fts5_falls_back_to_icontains(self):
+        search.uninstall_sqlite_index(connection)
+        unsupported = [f"CREATE VIRTUAL TABLE {search.FTS_TABLE} USING no_such_module(title)"]
+        with mock.patch.object(search, "SQLITE_INDEX_SQL", unsupported):
+            search.install_sqlite_index(connection)
+        # As post_migrate would after the migration.
+        schema.reset()
+        self.addCleanup(schema.reset)
+
+        self.assertNotIn(search.FTS_TABLE, connection.introspection.table_names())
+        self.assertIsInstance(search.get_backend(), search.ContainsBackend)
+        self.assertIn(self.in_title, search.search_matches("depok"))
+
+
+class MatchResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username="player1", password="12345")
+        self.category = SportCategory.objects.create(name="Futsal")
+        self.match = Match.objects.create(
+            title="Futsal Malam",
+            category=self.category,
+            location="Depok",
+            event_date=timezone.now() + timedelta(days=1),
+            max_members=10,
+        )
+        self.url = reverse("matches:get_match", args=[self.match.pk])
+
+    def test_match_is_served_from_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()["data"][0]["pk"], str(self.match.pk))
+        self.assertEqual(response.json()["data"][0]["fields"]["title"], "Futsal Malam")
+        self.assertEqual(self.client.get(reverse("matches:get_match", args=[uuid.uuid4()])).status_code, 404)
+
+    def test_match_and_participation_writes_invalidate(self):
+        self.client.get(self.url)
+        self.match.title = "Futsal Pagi"
+        self.match.save()
+        self.assertEqual(self.client.get(self.url).json()["data"][0]["fields"]["title"], "Futsal Pagi")
+
+        # participant_count moves through QuerySet.update(); the Participation
+        # signal is what invalidates the cached match.
+        Participation.objects.create(match=self.match, user=self.user)
+        self.assertEqual(self.client.get(self.url).json()["data"][0]["fields"]["participant_count"], 1)
+
+
+class MatchExportTest(TestCase):
+    def setUp(self):
+        category = SportCategory.objects.create(name="Futsal")
+        for i in range(3):
+            Match.objects.create(
+                title=f"Futsal {i}",
+                category=category,
+                location="Depok",
+                event_date=timezone.now() + timedelta(days=i + 1),
+                max_members=10,
+            )
+        self.url = reverse("matches:get_match")
+
+    def test_match_list_streams_serializer_records(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        data = json.loads(b"".join(response.streaming_content))
+        expected = json.loads(serializers.serialize("json", Match.objects.all()))
+        self.assertEqual(data, {"data": expected})
+
+    async def test_match_list_streams_asynchronously_under_asgi(self):
+        response = await self.async_client.get(self.url)
+        self.assertTrue(response.is_async)
+        data = json.loads(b"".join([chunk async for chunk in response.streaming_content]))
+        self.assertEqual([record["fields"]["title"] for record in data["data"]], ["Futsal 0", "Futsal 1", "Futsal 2"])
+
+    def test_match_list_as_ndjson(self):
+        response = self.client.get(self.url, {"format": "ndjson"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["fields"]["title"] for line in lines], ["Futsal 0", "Futsal 1", "Futsal 2"])
+
+
+class DashboardStatsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username="player1", password="12345")
+        self.category = SportCategory.objects.create(name="Futsal")
+        self.match = Match.objects.create(
+            title="Futsal Malam",
+            category=self.category,
+            location="Depok",
+            event_date=timezone.now(),
+            max_members=10,
+        )
+
+    def test_fresh_snapshot_is_read_without_queries(self):
+        snapshot = stats.get_snapshot()
+        self.assertEqual((snapshot["total_matches"], snapshot["today_matches"]), (1, 1))
+        self.assertEqual(snapshot["recent_activity"], [self.match])
+        with self.assertNumQueries(0):
+            self.assertEqual(stats.get_snapshot()["total_matches"], 1)
+
+    def test_participations_wait_for_the_max_age(self):
+        now = timezone.now()
+        stats.get_snapshot(now)
+        Participation.objects.create(match=self.match, user=self.user)
+        self.assertEqual(stats.get_snapshot(now + timedelta(seconds=30))["total_players"], 0)
+        with self.settings(DASHBOARD_STATS_MAX_AGE=10):
+            self.assertEqual(stats.get_snapshot(now + timedelta(seconds=30))["total_players"], 1)
+
+    def test_new_match_marks_snapshot_stale(self):
+        stats.get_snapshot()
+        Match.objects.create(
+            title="Basket Pagi",
+            category=self.category,
+            location="Senayan",
+            event_date=timezone.now() + timedelta(days=3),
+            max_members=10,
+        )
+        snapshot = stats.get_snapshot()
+        self.assertEqual(snapshot["total_matches"], 2)
+        self.assertEqual(snapshot["recent_activity"][0].title, "Basket Pagi")
+
+    def test_stale_snapshot_is_served_while_another_request_refreshes(self):
+        now = timezone.now()
+        stats.get_snapshot(now)
+        Participation.objects.create(match=self.match, user=self.user)
+        cache.add(stats.REFRESH_LOCK_KEY, True)
+        with self.assertNumQueries(0):
+            snapshot = stats.get_snapshot(now + timedelta(hours=1))
+        self.assertEqual(snapshot["total_players"], 0)
+
+    def test_refresh_command(self):
+        out = StringIO()
+        call_command("refresh_dashboard_stats", stdout=out)
+        self.assertIn("1 match(es)", out.getvalue())
+        with self.assertNumQueries(0):
+            stats.get_snapshot()
+
+
 class MatchFormTest(TestCase):
     def setUp(self):
         self.category = SportCategory.objects.create(name="Bulu Tangkis")
@@ -224,7 +525,27 @@ class MatchViewTest(TestCase):
     def test_get_all_matches(self):
         response = self.client.get(reverse("matches:get_match"))
         self.assertEqual(response.status_code, 200)
-        self.assertIn("data", response.json())
+        self.assertIn("data", json.loads(b"".join(response.streaming_content)))
+
+    def test_dashboard_ajax_query_count_is_constant(self):
+        for i in range(5):
+            match = Match.objects.create(
+                title=f"Match {i}",
+                category=self.category,
+                location="Lapangan",
+                event_date=timezone.now() + timedelta(days=1),
+                max_members=5,
+            )
+            Participation.objects.create(match=match, user=self.user)
+        schema.ensure_default_categories()
+        with self.assertNumQueries(3):  # session, user, grouped matches
+            response = self.client.get(
+                reverse("matches:dashboard"),
+                {"available_only": "on"},
+                HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+            )
+        groups = response.json()["groups"]
+        self.assertEqual(sum(len(group["matches"]) for group in groups), 6)
 
     def test_dashboard_ajax_request(self):
         response = self.client.get(
@@ -233,6 +554,59 @@ class MatchViewTest(TestCase):
         )
         self.assertEqual(response.status_code, 200)
         self.assertIn("groups", response.json())
+
+    def _dashboard_groups(self, **params):
+        response = self.client.get(
+            reverse("matches:dashboard"), params, HTTP_X_REQUESTED_WITH="XMLHttpRequest"
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()["groups"]
+
+    def test_dashboard_groups_are_capped_and_show_more_pages(self):
+        other = SportCategory.objects.create(name="Other")
+        basket = SportCategory.objects.create(name="Basket")
+        start = timezone.now() + timedelta(days=1)
+        for i in range(7):
+            Match.objects.create(
+                title=f"Bola {i}", category=self.category, location="Lapangan",
+                event_date=start + timedelta(hours=i % 3), max_members=5,
+            )
+        Match.objects.create(title="Lain", category=other, location="X", event_date=start, max_members=5)
+        Match.objects.create(title="Basket", category=basket, location="Y", event_date=start, max_members=5)
+
+        groups = self._dashboard_groups(group_size=3)
+        self.assertEqual([g["category"] for g in groups], ["Basket", "Sepak Bola", "Other"])
+        self.assertEqual([len(g["matches"]) for g in groups], [1, 3, 1])
+        self.assertIsNone(groups[0]["next_cursor"])
+
+        expected = [
+            str(pk) for pk in Match.objects.filter(category=self.category)
+            .order_by("event_date", "id").values_list("id", flat=True)
+        ]
+        seen = [m["id"] for m in groups[1]["matches"]]
+        cursor = groups[1]["next_cursor"]
+        while cursor:
+            (group,) = self._dashboard_groups(group_size=3, cursor=cursor)
+            self.assertEqual(group["category"], "Sepak Bola")
+            seen.extend(m["id"] for m in group["matches"])
+            cursor = group["next_cursor"]
+        self.assertEqual(seen, expected)
+
+    def test_dashboard_groups_combine_with_keyword_search(self):
+        Match.objects.create(
+            title="Futsal Depok", category=self.category, location="Depok",
+            event_date=timezone.now() + timedelta(days=2), max_members=5,
+        )
+        groups = self._dashboard_groups(keyword="depok", group_size=1)
+        self.assertEqual([m["title"] for m in groups[0]["matches"]], ["Futsal Depok"])
+        self.assertIsNone(groups[0]["next_cursor"])
+
+    def test_dashboard_rejects_invalid_cursor(self):
+        response = self.client.get(
+            reverse("matches:dashboard"), {"cursor": "bukan-cursor"},
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+        self.assertEqual(response.status_code, 400)
         
         
 from django.db.utils import OperationalError, ProgrammingError
@@ -297,8 +671,9 @@ class MatchEdgeCaseTest(TestCase):
 
 
     def test_is_schema_ready_handles_exceptions(self):
-        from matches import views
+        from matches import schema, views
         original_func = views.connection.introspection.table_names
+        schema.reset()
 
         def raise_error():
             raise OperationalError("Simulated DB failure")
@@ -316,7 +691,69 @@ class MatchEdgeCaseTest(TestCase):
 
         # Restore original
         views.connection.introspection.table_names = original_func
-        
-        
 
 
+class BookMatchConcurrencyTest(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Checked here rather than at import, once the test database is set up.
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            raise unittest.SkipTest("Concurrent bookings need a database shared between threads; set TEST_DB_NAME.")
+        super().setUpClass()
+
+    def setUp(self):
+        self.category = SportCategory.objects.create(name="Voli")
+        self.match = Match.objects.create(
+            title="Rebutan Slot",
+            category=self.category,
+            location="GOR Depok",
+            event_date=timezone.now() + timedelta(days=1),
+            max_members=10,
+        )
+
+    def _book_concurrently(self, users):
+        clients = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+        start = threading.Barrier(min(len(clients), 32))
+
+        def book(client):
+            try:
+                try:
+                    start.wait(timeout=10)
+                except threading.BrokenBarrierError:
+                    pass
+                response = client.post(reverse("matches:book_match", args=[self.match.pk]))
+                return response.status_code, response.json()
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            return list(pool.map(book, clients))
+
+    def test_concurrent_joins_never_overbook(self):
+        CustomUser.objects.bulk_create([CustomUser(username=f"voli{i}") for i in range(200)])
+        results = self._book_concurrently(CustomUser.objects.filter(username__startswith="voli"))
+
+        booked = [body for status, body in results if status == 200]
+        rejected = [body for status, body in results if status == 400]
+        self.assertEqual(len(booked), 10)
+        self.assertEqual(len(rejected), 190)
+        self.assertTrue(all("sudah penuh" in str(body) for body in rejected))
+
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.participant_count, 10)
+        self.assertEqual(Participation.objects.filter(match=self.match).count(), 10)
+
+    def test_concurrent_double_join_books_once(self):
+        user = CustomUser.objects.create(username="voli_ganda")
+        results = self._book_concurrently([user] * 20)
+
+        self.assertEqual([status for status, _ in results].count(200), 1)
+        self.assertTrue(
+            all("Kamu sudah bergabung" in str(body) for status, body in results if status != 200)
+        )
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.participant_count, 1)
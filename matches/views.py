@@ -1,6 +1,6 @@
-from django.db import connection
-from django.db.models import Count, F, Q
-from django.db.utils import OperationalError, ProgrammingError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Count, F, Value, When, Window
+from django.db.models.functions import RowNumber
 from django.http import JsonResponse, HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, render
 from django.views.decorators.http import require_http_methods
@@ -8,40 +8,26 @@ from django.views.decorators.csrf import csrf_exempt
 from django.core import serializers
 from liveChat.models import Group
 from accounts.models import CustomUser  # ✅ pastikan pakai model user-mu
+from sosmed_PBPF08 import pagination, response_cache, streaming
 import json, uuid
 from django.utils import timezone
 from datetime import timedelta
+from itertools import groupby
 
+from . import schema, search, stats
 from .forms import MatchForm, MatchSearchForm, ParticipationForm
 from .models import Match, Participation, SportCategory
 
 
-DEFAULT_CATEGORIES = [
-    "Sepak Bola", "Basket", "Bulu Tangkis", "Futsal", "Lari", "Bersepeda", "Other"
-]
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+GROUP_SIZE = 12
+GROUP_MAX_SIZE = 50
 
 
 def _is_schema_ready() -> bool:
     """Check whether the tables required for the match feature exist."""
-    try:
-        existing_tables = set(connection.introspection.table_names())
-    except (OperationalError, ProgrammingError):
-        return False
-
-    required_tables = {
-        SportCategory._meta.db_table,
-        Match._meta.db_table,
-        Participation._meta.db_table,
-    }
-    return required_tables.issubset(existing_tables)
-
-
-def _ensure_default_categories() -> None:
-    if not _is_schema_ready():
-        return
-
-    for name in DEFAULT_CATEGORIES:
-        SportCategory.objects.get_or_create(name=name)
+    return schema.tables_exist(SportCategory, Match, Participation)
 
 
 def _serialize_match(match: Match) -> dict:
@@ -59,9 +45,44 @@ def _serialize_match(match: Match) -> dict:
     }
 
 
+def _group_matches(matches, group_size: int) -> list:
+    """
+    Group ``matches`` by category, at most ``group_size`` per category, as
+    ``(category, matches, next_cursor)`` with "Other" last.
+
+    One query: each category's matches are numbered by a window function so
+    only ``group_size + 1`` of them are read (the extra one tells whether
+    there are more), and rows come back ordered by category so the groups
+    are cut in a single pass.
+    """
+    rows = (
+        matches.annotate(
+            position_in_category=Window(
+                RowNumber(),
+                partition_by=[F("category_id")],
+                order_by=[F("event_date").asc(), F("id").asc()],
+            )
+        )
+        .filter(position_in_category__lte=group_size + 1)
+        .order_by(
+            Case(When(category_id="Other", then=Value(1)), default=Value(0)),
+            "category_id",
+            "event_date",
+            "id",
+        )
+    )
+
+    groups = []
+    for _, items in groupby(rows, key=lambda match: match.category_id):
+        items, next_cursor = pagination.page(
+            list(items), group_size, lambda match: (match.category_id, match.event_date, match.id)
+        )
+        groups.append((items[0].category, items, next_cursor))
+    return groups
+
+
 @require_http_methods(["GET"])
 def match_dashboard(request):
-    print("DEBUG SPORT FILTER:", request.GET.get("sport"))
     schema_ready = _is_schema_ready()
 
     if not schema_ready:
@@ -97,14 +118,10 @@ def match_dashboard(request):
 
         return render(request, "matches/dashboard.html", context, status=503)
 
-    _ensure_default_categories()
+    schema.ensure_default_categories()
 
     # ===================== MATCH FILTER =====================
-    matches = (
-        Match.objects.select_related("category")
-        .annotate(participant_count=Count("participations"))
-        .order_by("event_date")
-    )
+    matches = Match.objects.select_related("category").order_by("event_date")
 
     search_form = MatchSearchForm(request.GET or None)
     if search_form.is_valid():
@@ -128,60 +145,46 @@ def match_dashboard(request):
         if category:
             matches = matches.filter(category=category)
         if keyword:
-            matches = matches.filter(
-                Q(title__icontains=keyword)
-                | Q(description__icontains=keyword)
-                | Q(location__icontains=keyword)
-            )
+            matches = search.search_matches(keyword, matches)
         if available_only:
             matches = matches.filter(participant_count__lt=F("max_members"))
 
-    match_list = list(matches)
-    categories = list(SportCategory.objects.all().order_by('name'))
-    categories = sorted(categories, key=lambda c: c.name == "Other")
+    try:
+        group_size = min(int(request.GET.get("group_size", GROUP_SIZE)), GROUP_MAX_SIZE)
+    except ValueError:
+        group_size = 0
+    cursor = request.GET.get("cursor")
+    position = pagination.decode_cursor(cursor, str, pagination.timestamp, uuid.UUID) if cursor else None
+    if group_size < 1 or (cursor and position is None):
+        return JsonResponse(
+            {"success": False, "errors": {"__all__": ["Parameter group_size dan cursor wajib valid."]}},
+            status=400,
+        )
+    if position:
+        # "Show more" for one category: the matches after the last one shown.
+        category_id, *last = position
+        matches = matches.filter(category_id=category_id).filter(pagination.after(("event_date", "id"), last))
 
-    grouped_matches = [
-        (category, [m for m in match_list if m.category == category])
-        for category in categories
-    ]
-    has_any_match = any(matches for _, matches in grouped_matches)
+    grouped_matches = _group_matches(matches, group_size)
+    has_any_match = bool(grouped_matches)
 
     if request.headers.get("x-requested-with") == "XMLHttpRequest":
-        payload = []
-        for category, items in grouped_matches:
-            if not items:
-                continue
-            payload.append(
-                {
-                    "category": category.name,
-                    "category_slug": category.slug,
-                    "matches": [_serialize_match(match) for match in items],
-                }
-            )
+        payload = [
+            {
+                "category": category.name,
+                "category_slug": category.slug,
+                "matches": [_serialize_match(match) for match in items],
+                "next_cursor": next_cursor,
+            }
+            for category, items, next_cursor in grouped_matches
+        ]
         return JsonResponse({"groups": payload})
 
+    categories = list(SportCategory.objects.all().order_by('name'))
+    categories = sorted(categories, key=lambda c: c.name == "Other")
+
     # ===================== SIDEBAR STATS =====================
-    now = timezone.now()
-    today = now.date()
-    ten_minutes_ago = now - timedelta(minutes=10)
-
-    # total matches, etc.
-    total_matches = Match.objects.count()
-    today_matches = Match.objects.filter(event_date__date=today).count()
-    total_players = Participation.objects.values('user').distinct().count()
-    sports_count = SportCategory.objects.count()
-
-    # ✅ user online & active today
-    players_online = CustomUser.objects.filter(last_activity__gte=ten_minutes_ago).distinct().count()
-    players_active_today = CustomUser.objects.filter(last_activity__date=today).distinct().count()
-
-    # popular sports
-    popular_sports = (
-        SportCategory.objects.annotate(match_count=Count("matches"))
-        .order_by("-match_count")[:3]
-    )
-    # recent activity
-    recent_activity = Match.objects.select_related("category").order_by("-id")[:5]
+    sidebar = stats.get_snapshot()
 
     context = {
         "grouped_matches": grouped_matches,
@@ -191,14 +194,14 @@ def match_dashboard(request):
         "has_any_match": has_any_match,
         "schema_ready": True,
         "categories": categories,
-        "total_matches": total_matches,
-        "today_matches": today_matches,
-        "total_players": total_players,
-        "sports_count": sports_count,
-        "popular_sports": popular_sports,
-        "recent_activity": recent_activity,
-        "players_online": players_online,
-        "players_active_today": players_active_today,
+        "total_matches": sidebar["total_matches"],
+        "today_matches": sidebar["today_matches"],
+        "total_players": sidebar["total_players"],
+        "sports_count": sidebar["sports_count"],
+        "popular_sports": sidebar["popular_sports"],
+        "recent_activity": sidebar["recent_activity"],
+        "players_online": sidebar["players_online"],
+        "players_active_today": sidebar["players_active_today"],
     }
 
     return render(request, "matches/dashboard.html", context)
@@ -207,7 +210,7 @@ def match_dashboard(request):
 @require_http_methods(["POST"])
 @csrf_exempt
 def create_match(request: HttpRequest):
-    _ensure_default_categories()
+    schema.ensure_default_categories()
     if not _is_schema_ready():
         return JsonResponse(
             {
@@ -260,21 +263,37 @@ def book_match(request: HttpRequest, match_id: uuid):
             status=503,
         )
 
-    match = get_object_or_404(Match.objects.select_related("category"), pk=match_id)
-
-    if match.available_slots <= 0:
-        return JsonResponse(
-            {
-                "success": False,
-                "errors": {
-                    "__all__": ["Match ini sudah penuh. Pilih match lain atau buat baru."]
-                },
-            },
-            status=400,
-        )
+    form = ParticipationForm({"user": request.user.pk, "message": request.POST.get("message", "")})
+    if not form.is_valid():
+        return JsonResponse({"success": False, "errors": form.errors}, status=400)
 
-    # 🚨 Tambahkan ini untuk mencegah user join dua kali
-    if Participation.objects.filter(match=match, user=request.user).exists():
+    try:
+        with transaction.atomic():
+            # Lock the match row and check capacity in one statement. Concurrent
+            # joins queue on this UPDATE and re-check the condition once the
+            # lock is released, which select_for_update() can't give us on SQLite.
+            has_room = Match.objects.filter(
+                pk=match_id, participant_count__lt=F("max_members")
+            ).update(participant_count=F("participant_count"))
+            if not has_room:
+                get_object_or_404(Match, pk=match_id)
+                return JsonResponse(
+                    {
+                        "success": False,
+                        "errors": {
+                            "__all__": ["Match ini sudah penuh. Pilih match lain atau buat baru."]
+                        },
+                    },
+                    status=400,
+                )
+
+            match = Match.objects.select_related("category").get(pk=match_id)
+            participation: Participation = form.save(commit=False)
+            participation.match = match
+            # Bumps match.participant_count in the database and on `match`.
+            participation.save()
+    except IntegrityError:
+        # 🚨 unique_participation_per_match: user sudah join match ini
         return JsonResponse(
             {
                 "success": False,
@@ -285,23 +304,13 @@ def book_match(request: HttpRequest, match_id: uuid):
             status=400,
         )
 
-    form = ParticipationForm({"user": request.user.pk, "message": request.POST.get("message", "")})
-    if form.is_valid():
-        participation: Participation = form.save(commit=False)
-        participation.match = match
-        participation.save()
-
-        updated_match = Match.objects.select_related("category").get(id=match_id)
-
-        return JsonResponse(
-            {
-                "success": True,
-                "message": "Kamu berhasil mendaftar pada match ini.",
-                "match": _serialize_match(updated_match),
-            }
-        )
-
-    return JsonResponse({"success": False, "errors": form.errors}, status=400)
+    return JsonResponse(
+        {
+            "success": True,
+            "message": "Kamu berhasil mendaftar pada match ini.",
+            "match": _serialize_match(match),
+        }
+    )
 
 @csrf_exempt
 def delete_match(request: HttpRequest, match_id: uuid = ''):
@@ -313,13 +322,40 @@ def delete_match(request: HttpRequest, match_id: uuid = ''):
         Match.objects.all().delete()
     return HttpResponse(status=204)
 
+@require_http_methods(["GET"])
+def search_match(request: HttpRequest):
+    """Ranked keyword search: ?q=<keyword>&limit=<n>, best match first."""
+    keyword = request.GET.get("q", "").strip()
+    try:
+        limit = min(int(request.GET.get("limit", SEARCH_PAGE_SIZE)), SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = 0
+    if not keyword or limit < 1:
+        return JsonResponse(
+            {"success": False, "errors": {"__all__": ["Parameter q dan limit wajib valid."]}},
+            status=400,
+        )
+
+    results = search.search_matches(keyword, Match.objects.select_related("category"))[:limit]
+    return JsonResponse(
+        {
+            "success": True,
+            "data": [
+                {**_serialize_match(match), "rank": match.search_rank}
+                for match in results
+            ],
+        }
+    )
+
 def get_match(request: HttpRequest, match_id: uuid = None):
     if match_id:
-        match = get_object_or_404(Match, id=match_id)
-        data = serializers.serialize("json", [match])
-    else:
-        matches = Match.objects.all()
-        data = serializers.serialize("json", matches)
-    return JsonResponse({"data": json.loads(data)})
+        # Cached until a match, participation or category changes.
+        def build():
+            match = get_object_or_404(Match, id=match_id)
+            return json.loads(serializers.serialize("json", [match]))
+        data = response_cache.cached(["matches"], f"matches:get_match:{match_id}", build)
+        return JsonResponse({"data": data})
+    # Every match: streamed row by row instead of built in memory.
+    return streaming.stream_json(request, {"data": Match.objects.all()})
 
     
\ No newline at end of file
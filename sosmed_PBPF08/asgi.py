@@ -3,6 +3,10 @@ ASGI config for sosmed_PBPF08 project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live chat stream (liveChat/chat/<group_id>/stream/) keeps a connection
+open per client, so serve it through this module with an ASGI server, e.g.
+``gunicorn sosmed_PBPF08.asgi:application -k uvicorn.workers.UvicornWorker``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -14,3 +18,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sosmed_PBPF08.settings')
 
 application = get_asgi_application()
+
+# Write buffered last_activity timestamps when the worker exits.
+from accounts import presence  # noqa: E402
+
+presence.flush_on_exit()
@@ -0,0 +1,212 @@
+"""
+Per-view query count and latency instrumentation.
+
+QueryMetricsMiddleware counts the SQL statements a request runs (through
+``connection.execute_wrapper``, so it works without DEBUG) and times them,
+the view and the whole request. For every resolved URL name it
+
+- adds a ``Server-Timing`` header when METRICS_SERVER_TIMING is on,
+- keeps running totals in this process, written to the
+  ``sosmed_PBPF08.metrics`` logger as one JSON line per view at most every
+  METRICS_FLUSH_INTERVAL seconds, and
+- compares the query count with QUERY_BUDGETS. An overrun is logged, or
+  raised as QueryBudgetExceeded inside ``enforce_budgets()`` (meant for
+  tests) or when METRICS_ENFORCE_BUDGETS is set.
+
+Queries run while a StreamingHttpResponse is consumed happen after the
+middleware has returned and are not counted; neither is their size.
+
+The middleware works in both sync and async stacks, so under ASGI async
+views (the chat long-poll and stream) are awaited instead of holding a
+thread. There, queries run in the request's thread-sensitive
+``sync_to_async`` thread, so that is where the recorder is installed.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+UNRESOLVED = "<unresolved>"
+
+_totals = {}
+_totals_lock = threading.Lock()
+_last_flush = time.monotonic()
+_enforced_budgets = None
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class _QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def budgets():
+    """Query budgets in force: QUERY_BUDGETS, overridden by ``enforce_budgets()``."""
+    return {**_setting("QUERY_BUDGETS", {}), **(_enforced_budgets or {})}
+
+
+@contextmanager
+def enforce_budgets(overrides=None):
+    """Raise QueryBudgetExceeded for over-budget requests inside the block."""
+    global _enforced_budgets
+    previous = _enforced_budgets
+    _enforced_budgets = {**(previous or {}), **(overrides or {})}
+    try:
+        yield
+    finally:
+        _enforced_budgets = previous
+
+
+def _record(view_name, queries, sql_ms, view_ms, size, over_budget):
+    with _totals_lock:
+        totals = _totals.setdefault(view_name, {
+            "requests": 0, "queries": 0, "queries_max": 0, "sql_ms": 0.0,
+            "view_ms": 0.0, "view_ms_max": 0.0, "bytes": 0, "over_budget": 0,
+        })
+        totals["requests"] += 1
+        totals["queries"] += queries
+        totals["queries_max"] = max(totals["queries_max"], queries)
+        totals["sql_ms"] += sql_ms
+        totals["view_ms"] += view_ms
+        totals["view_ms_max"] = max(totals["view_ms_max"], view_ms)
+        totals["bytes"] += size or 0
+        totals["over_budget"] += over_budget
+
+
+def snapshot():
+    """Averages per view since the last flush, keyed by URL name."""
+    with _totals_lock:
+        totals = {name: dict(values) for name, values in _totals.items()}
+    report = {}
+    for name, values in totals.items():
+        requests = values["requests"]
+        report[name] = {
+            "requests": requests,
+            "queries_avg": round(values["queries"] / requests, 2),
+            "queries_max": values["queries_max"],
+            "sql_ms_avg": round(values["sql_ms"] / requests, 2),
+            "view_ms_avg": round(values["view_ms"] / requests, 2),
+            "view_ms_max": round(values["view_ms_max"], 2),
+            "bytes_avg": round(values["bytes"] / requests),
+            "over_budget": values["over_budget"],
+        }
+    return report
+
+
+def flush():
+    """Log the totals gathered since the last flush and start over."""
+    global _last_flush
+    report = snapshot()
+    with _totals_lock:
+        _totals.clear()
+        _last_flush = time.monotonic()
+    for name, values in sorted(report.items()):
+        logger.info(json.dumps({"view": name, **values}))
+    return report
+
+
+def reset():
+    """Drop gathered totals without logging them. Meant for tests."""
+    global _last_flush
+    with _totals_lock:
+        _totals.clear()
+        _last_flush = time.monotonic()
+
+
+def _server_timing(queries, sql_ms, view_ms, total_ms):
+    return (
+        f'db;dur={sql_ms:.1f};desc="{queries} queries", '
+        f"view;dur={view_ms:.1f}, total;dur={total_ms:.1f}"
+    )
+
+
+def _watch_queries(stack, recorder):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+
+
+class QueryMetricsMiddleware:
+    """Measure every request; see sosmed_PBPF08.metrics."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder = _QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            _watch_queries(stack, recorder)
+            response = self.get_response(request)
+        return self._measure(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        recorder = _QueryRecorder()
+        started = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(_watch_queries)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._measure(request, response, recorder, started)
+
+    def _measure(self, request, response, recorder, started):
+        finished = time.perf_counter()
+
+        match = getattr(request, "resolver_match", None)
+        view_name = match.view_name if match else UNRESOLVED
+        view_started = getattr(request, "_metrics_view_started", finished)
+        sql_ms = recorder.duration * 1000
+        view_ms = (finished - view_started) * 1000
+        total_ms = (finished - started) * 1000
+        size = None if response.streaming else len(response.content)
+
+        if _setting("METRICS_SERVER_TIMING", False):
+            response["Server-Timing"] = _server_timing(recorder.count, sql_ms, view_ms, total_ms)
+
+        budget = budgets().get(view_name)
+        over_budget = budget is not None and recorder.count > budget
+        _record(view_name, recorder.count, sql_ms, view_ms, size, over_budget)
+        if time.monotonic() - _last_flush >= _setting("METRICS_FLUSH_INTERVAL", 60):
+            flush()
+
+        if over_budget:
+            message = f"{view_name} ran {recorder.count} queries, over its budget of {budget}"
+            if _enforced_budgets is not None or _setting("METRICS_ENFORCE_BUDGETS", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view_started = time.perf_counter()
@@ -0,0 +1,73 @@
+"""
+Keyset pagination for the paged JSON views.
+
+Rows are ordered by a unique key (e.g. ``-created_at, -id``) and a page is
+read as ``limit + 1`` rows, the extra one only telling whether another page
+exists. The next page starts after the key of the last row shown, which is
+handed to the client as an opaque cursor: the key's values joined by "|" in
+URL-safe base64.
+
+    rows = rows.filter(pagination.after(("-created_at", "-id"), position))
+    items, next_cursor = pagination.page(rows, limit, lambda row: (row.created_at, row.id))
+"""
+import base64
+import operator
+from functools import reduce
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def timestamp(value):
+    """Parse an ISO 8601 datetime from a cursor; raise ValueError if it is not one."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    return parsed
+
+
+def encode_cursor(*values):
+    raw = "|".join(value.isoformat() if hasattr(value, "isoformat") else str(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, *types):
+    """
+    Split ``cursor`` back into one value per entry of ``types``, each a
+    callable such as ``int``, ``uuid.UUID`` or ``timestamp`` that raises
+    ValueError on bad input. Only the first value may itself contain "|".
+    Return the values as a tuple, or None if the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        parts = raw.rsplit("|", len(types) - 1)
+        if len(parts) != len(types):
+            return None
+        return tuple(parse(part) for parse, part in zip(types, parts))
+    except (ValueError, UnicodeError):
+        return None
+
+
+def after(fields, position):
+    """
+    Q for the rows that come after ``position`` when ordered by ``fields``
+    (order_by names, "-" for descending): (a > x) | (a = x & b > y) | ...
+    """
+    clauses, equal = [], {}
+    for field, value in zip(fields, position):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        clauses.append(Q(**equal, **{f"{name}__{lookup}": value}))
+        equal[name] = value
+    return reduce(operator.or_, clauses)
+
+
+def page(rows, limit, key):
+    """
+    The first ``limit`` of ``rows`` (a queryset or list, already ordered and
+    filtered past the cursor) and the cursor of the page after them, or None
+    on the last page. ``key(row)`` returns the values the cursor is made of.
+    """
+    rows = list(rows[:limit + 1])
+    items = rows[:limit]
+    return items, encode_cursor(*key(items[-1])) if len(rows) > limit else None
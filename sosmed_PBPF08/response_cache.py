@@ -0,0 +1,72 @@
+"""
+Versioned caching for read-heavy JSON responses.
+
+Every cached value belongs to one or more namespaces ("matches", "venues",
+"threads"). Each namespace has a version number in the cache and the
+versions are part of the key, so ``bump(namespace)`` makes every entry built
+from older data unreachable at once, without having to know its key. The
+bumps are wired to post_save / post_delete in each app's ``signals.py``;
+writes that skip signals (``QuerySet.update``, ``bulk_create``) must call
+``bump`` themselves.
+
+Values are shared by every visitor, so they must not contain per-user fields
+such as ``isLiked``; views merge those in after the lookup.
+
+The cache used is the ``default`` one from ``settings.CACHES``.
+RESPONSE_CACHE_TIMEOUT bounds how long an entry lives even if a bump is
+missed.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+DEFAULT_TIMEOUT = 5 * 60
+
+
+def _version_key(namespace):
+    return f"cache_version:{namespace}"
+
+
+def _versions(namespaces):
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the clock rather than 1 so a version lost to eviction
+            # never brings back entries stored under an earlier number.
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [str(versions[key]) for key in keys]
+
+
+def cached(namespaces, key, compute, timeout=None):
+    """
+    Return the value cached under ``key`` for the current versions of
+    ``namespaces``, calling ``compute()`` and storing its result on a miss.
+    """
+    versioned_key = f"{key}:{'.'.join(_versions(namespaces))}"
+    value = cache.get(versioned_key)
+    if value is None:
+        value = compute()
+        if timeout is None:
+            timeout = getattr(settings, "RESPONSE_CACHE_TIMEOUT", DEFAULT_TIMEOUT)
+        cache.set(versioned_key, value, timeout=timeout)
+    return value
+
+
+def _bump(namespaces):
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            cache.add(_version_key(namespace), time.time_ns(), timeout=None)
+
+
+def bump(*namespaces):
+    """Invalidate everything cached for ``namespaces``."""
+    _bump(namespaces)
+    # A request between the bump above and the commit may still cache the old
+    # rows under the new version, so bump once more when the write is visible.
+    transaction.on_commit(lambda: _bump(namespaces))
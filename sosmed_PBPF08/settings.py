@@ -65,6 +65,7 @@ INSTALLED_APPS = [
     'accounts',
     'matches',
     'threads',
+    'benchmarks',
 ]
 
 TAILWIND_APP_NAME = 'theme'
@@ -76,6 +77,7 @@ INTERNAL_IPS = [
 NPM_BIN_PATH = "/usr/local/bin/npm"
 
 MIDDLEWARE = [
+    'sosmed_PBPF08.metrics.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,8 +85,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'accounts.middleware.UpdateLastActivityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'accounts.middleware.PresenceMiddleware',
+    'sosmed_PBPF08.middleware.AsyncWhiteNoiseMiddleware',
 ]
 
 ROOT_URLCONF = 'sosmed_PBPF08.urls'
@@ -133,8 +135,142 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Concurrent writers wait for the lock instead of failing at once.
+            'OPTIONS': {'timeout': 20},
         }
     }
+    # Tests run on an in-memory database, which threads cannot share, so the
+    # concurrency tests are skipped there. To run them, point TEST_DB_NAME at
+    # a file, e.g. TEST_DB_NAME=test_db.sqlite3 python manage.py test.
+    if os.getenv('TEST_DB_NAME'):
+        DATABASES['default']['TEST'] = {'NAME': BASE_DIR / os.getenv('TEST_DB_NAME')}
+
+
+# Cache
+# Local memory by default. Every worker process has its own local-memory
+# cache, so with several workers set CACHE_BACKEND to "file" or "db" (the
+# latter needs `python manage.py createcachetable`) so invalidations reach
+# all of them.
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+        }
+    }
+elif CACHE_BACKEND == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', 'django_cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sosmed-pbpf08',
+        }
+    }
+
+# Lifetime in seconds of sosmed_PBPF08.response_cache entries.
+RESPONSE_CACHE_TIMEOUT = 5 * 60
+
+
+# Presence (accounts.presence)
+# last_activity is written at most once per PRESENCE_THROTTLE seconds per user
+# and flushed in bulk every PRESENCE_FLUSH_INTERVAL seconds, when a worker
+# exits, and by `python manage.py flush_presence` (run it from cron where
+# processes idle or are frozen between requests; it only sees the buffer with
+# a shared CACHE_BACKEND). "Online" means seen within the last
+# PRESENCE_ONLINE_WINDOW minutes.
+
+PRESENCE_THROTTLE = 60
+PRESENCE_FLUSH_INTERVAL = 60
+PRESENCE_ONLINE_WINDOW = 10
+
+
+# Match dashboard sidebar (matches.stats)
+# The statistics snapshot is recomputed once it is older than this many
+# seconds, or earlier when a match or sport category changes.
+
+DASHBOARD_STATS_MAX_AGE = 60
+
+
+# Request metrics (sosmed_PBPF08.metrics)
+# Query count, SQL time, view time and response size per URL name. Totals are
+# logged to METRICS_LOG_FILE every METRICS_FLUSH_INTERVAL seconds. A view
+# running more queries than its QUERY_BUDGETS entry is logged as a warning,
+# or fails the request when METRICS_ENFORCE_BUDGETS is on.
+
+# Server-Timing exposes query counts and timings to every client; off unless asked for.
+METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'False').lower() == 'true'
+METRICS_FLUSH_INTERVAL = 60
+METRICS_ENFORCE_BUDGETS = os.getenv('METRICS_ENFORCE_BUDGETS', 'False').lower() == 'true'
+METRICS_LOG_FILE = os.getenv('METRICS_LOG_FILE', str(BASE_DIR / 'metrics.log'))
+
+# Counted per request, session and user lookups included. A request
+# that happens to flush presence (accounts.presence) runs a few more.
+QUERY_BUDGETS = {
+    # 4 when the thread list is cached (counters are read fresh), 5 when it is rebuilt.
+    'threads:show_json': 5,
+    'threads:show_feed_json': 4,
+    'threads:get_replies_by_threadId': 4,
+    'threads:get_replies_page': 4,
+    'threads:trending_tags_json': 3,
+    # 5 when the sidebar stats snapshot is fresh, 13 when it is recomputed.
+    'matches:dashboard': 13,
+    'matches:search_match': 3,
+    'livechat:operate_group': 5,
+    # GET pages the history; POST validates, saves and publishes a chat.
+    'livechat:operate_chat_by_group': 9,
+    'booking_venue:api_venues': 3,
+    'booking_venue:api_venue_availability': 4,
+    'accounts:profile_history': 3,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'metrics': {
+            'class': 'logging.FileHandler',
+            'filename': METRICS_LOG_FILE,
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'sosmed_PBPF08.metrics': {
+            'handlers': ['metrics'],
+            'level': 'INFO',
+        },
+    },
+}
+
+
+# Live chat push transport
+# LIVECHAT_TRANSPORT picks how the chat page receives new messages:
+#   "poll"      - a plain GET every LIVECHAT_CLIENT_POLL_INTERVAL seconds; works on any
+#                 WSGI deployment (the default, and what Vercel runs).
+#   "long-poll" - each request waits up to LIVECHAT_LONG_POLL_TIMEOUT seconds,
+#                 holding a worker for that long under WSGI.
+#   "sse"       - Server-Sent Events. Needs an ASGI server, e.g.
+#                 gunicorn sosmed_PBPF08.asgi:application -k uvicorn.workers.UvicornWorker
+#                 Under WSGI the stream never returns and ties up a worker per tab,
+#                 so the stream endpoint answers 404 unless this is selected.
+# InProcessBroker only reaches connections held by the same worker process;
+# use liveChat.pubsub.DatabasePollingBroker when running several workers.
+# LIVECHAT_POLL_INTERVAL is how often that broker checks the database for new
+# chats, server side; it has nothing to do with how often browsers poll.
+
+LIVECHAT_TRANSPORT = os.getenv('LIVECHAT_TRANSPORT', 'poll')
+LIVECHAT_BROKER = os.getenv('LIVECHAT_BROKER', 'liveChat.pubsub.InProcessBroker')
+LIVECHAT_POLL_INTERVAL = 1
+LIVECHAT_CLIENT_POLL_INTERVAL = 5
+LIVECHAT_LONG_POLL_TIMEOUT = 25
+LIVECHAT_STREAM_HEARTBEAT = 15
 
 
 # Password validation
@@ -0,0 +1,161 @@
+import json
+import logging
+import uuid
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.db.models import Q
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from booking_venue.models import Venue
+from liveChat.models import Chat, Group
+from matches.models import Match, Participation, SportCategory
+from sosmed_PBPF08 import metrics, pagination
+from threads.models import ReplyChild, Thread
+
+
+@override_settings(PRESENCE_FLUSH_INTERVAL=3600, METRICS_FLUSH_INTERVAL=3600)
+class QueryMetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.user = CustomUser.objects.create_user(username="player", password="12345")
+        self.client.login(username="player", password="12345")
+        self.thread = Thread.objects.create(user=self.user, content="Hello", tags="futsal")
+
+    def test_server_timing_header(self):
+        with self.settings(METRICS_SERVER_TIMING=True):
+            response = self.client.get(reverse("threads:show_feed_json"))
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^db;dur=[\d.]+;desc="4 queries", view;dur=[\d.]+, total;dur=[\d.]+$',
+        )
+        with self.settings(METRICS_SERVER_TIMING=False):
+            self.assertNotIn("Server-Timing", self.client.get(reverse("threads:show_feed_json")))
+
+    async def test_async_requests_are_measured(self):
+        await self.async_client.aforce_login(self.user)
+        with self.settings(METRICS_SERVER_TIMING=True):
+            response = await self.async_client.get(reverse("threads:show_feed_json"))
+        self.assertIn('desc="4 queries"', response["Server-Timing"])
+
+    def test_middleware_stack_stays_async_under_asgi(self):
+        # Django logs every handler it has to adapt between sync and async.
+        with self.settings(DEBUG=True), self.assertNoLogs("django.request", "DEBUG"):
+            ASGIHandler()
+
+    def test_totals_are_kept_per_url_name_and_flushed_to_the_log(self):
+        for _ in range(2):
+            self.client.get(reverse("threads:show_feed_json"))
+        self.client.get("/no-such-page/")
+
+        report = metrics.snapshot()
+        feed = report["threads:show_feed_json"]
+        self.assertEqual((feed["requests"], feed["queries_avg"], feed["queries_max"]), (2, 4, 4))
+        self.assertGreater(feed["bytes_avg"], 0)
+        self.assertIn(metrics.UNRESOLVED, report)
+
+        with self.assertLogs("sosmed_PBPF08.metrics", level=logging.INFO) as logs:
+            metrics.flush()
+        lines = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertIn("threads:show_feed_json", [line["view"] for line in lines])
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_over_budget_is_logged_or_raised(self):
+        url = reverse("threads:show_feed_json")
+        with self.settings(QUERY_BUDGETS={"threads:show_feed_json": 2}):
+            with self.assertLogs("sosmed_PBPF08.metrics", level=logging.WARNING):
+                self.assertEqual(self.client.get(url).status_code, 200)
+            with metrics.enforce_budgets():
+                with self.assertRaises(metrics.QueryBudgetExceeded):
+                    self.client.get(url)
+        with metrics.enforce_budgets({"threads:show_feed_json": 4}):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(metrics.snapshot()["threads:show_feed_json"]["over_budget"], 2)
+
+
+@override_settings(PRESENCE_FLUSH_INTERVAL=3600, METRICS_FLUSH_INTERVAL=3600)
+class QueryBudgetTest(TestCase):
+    """The main read endpoints stay within QUERY_BUDGETS however much data there is."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username="player", password="12345")
+        others = [CustomUser.objects.create_user(username=f"user{i}", password="12345") for i in range(5)]
+        category = SportCategory.objects.create(name="Futsal")
+
+        for i in range(20):
+            thread = Thread.objects.create(user=others[i % 5], content=f"Thread {i}", tags="futsal,depok")
+            thread.changeLike(self.user)
+        self.thread = thread
+        for i in range(20):
+            reply = ReplyChild.objects.create(thread=self.thread, content=f"Reply {i}", user=others[i % 5])
+            reply.changeLike(self.user)
+
+        for i in range(10):
+            match = Match.objects.create(
+                title=f"Futsal {i}",
+                category=category,
+                location="Depok",
+                event_date=timezone.now() + timedelta(days=i),
+                max_members=10,
+            )
+            group = Group.objects.create(match=match, name=f"Group {match.title}")
+            Participation.objects.create(match=match, user=self.user)
+            for other in others[:3]:
+                Participation.objects.create(match=match, user=other)
+                Chat.objects.create(group_id=group, username=other, message="Halo")
+        self.group = group
+
+        self.venue = Venue.objects.create(
+            name="Stadion", location="Jakarta, Indonesia", capacity=1000, description="", price=100,
+        )
+        self.client.login(username="player", password="12345")
+
+    def test_main_endpoints_stay_within_budget(self):
+        metrics.reset()
+        urls = [
+            reverse("threads:show_json"),
+            reverse("threads:show_feed_json"),
+            reverse("threads:get_replies_by_threadId", args=[self.thread.id]),
+            reverse("threads:get_replies_page", args=[self.thread.id]),
+            reverse("threads:trending_tags_json"),
+            reverse("matches:dashboard"),
+            reverse("matches:search_match") + "?q=futsal",
+            reverse("liveChat:operate_group"),
+            reverse("liveChat:operate_chat_by_group", args=[self.group.id]),
+            reverse("booking_venue:api_venues"),
+            reverse("booking_venue:api_venue_availability", args=[self.venue.id]),
+            reverse("accounts:profile_history"),
+        ]
+        with metrics.enforce_budgets():
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+            response = self.client.get(reverse("matches:dashboard"), HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(metrics.snapshot()) - set(metrics.budgets()), set())
+
+
+class PaginationTest(SimpleTestCase):
+    def test_cursor_round_trip(self):
+        position = ("Sepak | Bola", timezone.now(), uuid.uuid4())
+        cursor = pagination.encode_cursor(*position)
+        self.assertEqual(pagination.decode_cursor(cursor, str, pagination.timestamp, uuid.UUID), position)
+
+    def test_malformed_cursors_decode_to_none(self):
+        for cursor in ("not-a-cursor", pagination.encode_cursor("yesterday", 1), pagination.encode_cursor(1)):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(pagination.decode_cursor(cursor, pagination.timestamp, int))
+
+    def test_page_returns_a_cursor_only_when_more_rows_exist(self):
+        rows = list(range(5))
+        self.assertEqual(pagination.page(rows, 3, lambda row: (row,)), ([0, 1, 2], pagination.encode_cursor(2)))
+        self.assertEqual(pagination.page(rows, 5, lambda row: (row,)), (rows, None))
+
+    def test_after_follows_the_sort_direction_of_each_field(self):
+        condition = pagination.after(("-likeCount", "id"), (3, 7))
+        self.assertEqual(str(condition), str(Q(likeCount__lt=3) | Q(likeCount=3, id__gt=7)))
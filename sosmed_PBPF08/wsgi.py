@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sosmed_PBPF08.settings')
 
 application = get_wsgi_application()
+
+# Write buffered last_activity timestamps when the worker exits.
+from accounts import presence  # noqa: E402
+
+presence.flush_on_exit()
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from threads.models import Tag, Thread, ThreadTag, parse_tags
+
+
+class Command(BaseCommand):
+    help = 'Parse Thread.tags of existing threads into Tag / ThreadTag rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Threads per batch (default: 500)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        threads = Thread.objects.only('id', 'tags', 'created_at').order_by('created_at', 'id')
+        processed = linked = 0
+        batch = []
+        for thread in threads.iterator(chunk_size=batch_size):
+            batch.append(thread)
+            if len(batch) >= batch_size:
+                linked += self._backfill(batch)
+                processed += len(batch)
+                batch = []
+        if batch:
+            linked += self._backfill(batch)
+            processed += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {processed} thread(s), {linked} new thread-tag link(s).'
+        ))
+
+    def _backfill(self, threads):
+        """Replace the tag links of ``threads`` with what their text says, in a few queries."""
+        wanted = {thread.pk: parse_tags(thread.tags) for thread in threads}
+        names = {name for thread_names in wanted.values() for name in thread_names}
+
+        with transaction.atomic():
+            Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+            tag_ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+
+            existing = {
+                (thread_id, tag_id): pk
+                for pk, thread_id, tag_id in ThreadTag.objects.filter(thread__in=wanted)
+                .values_list('pk', 'thread_id', 'tag_id')
+            }
+            desired = {
+                (thread.pk, tag_ids[name]): thread.created_at
+                for thread in threads
+                for name in wanted[thread.pk]
+            }
+
+            stale = [pk for key, pk in existing.items() if key not in desired]
+            if stale:
+                ThreadTag.objects.filter(pk__in=stale).delete()
+
+            missing = [
+                ThreadTag(thread_id=thread_id, tag_id=tag_id, created_at=created_at)
+                for (thread_id, tag_id), created_at in desired.items()
+                if (thread_id, tag_id) not in existing
+            ]
+            ThreadTag.objects.bulk_create(missing, ignore_conflicts=True)
+        return len(missing)
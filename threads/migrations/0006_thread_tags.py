@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0005_thread_feed_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ThreadTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thread_links', to='threads.tag')),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='threads.thread')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tag', '-created_at'], name='thread_tag_feed_idx'), models.Index(fields=['created_at'], name='thread_tag_created_idx')],
+                'constraints': [models.UniqueConstraint(fields=('thread', 'tag'), name='unique_thread_tag')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0006_thread_tags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='replychild',
+            index=models.Index(fields=['thread', '-likeCount', '-created_at', '-id'], name='reply_top_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threads', '0007_reply_top_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='threadtag',
+            name='thread_tag_feed_idx',
+        ),
+        migrations.AddIndex(
+            model_name='threadtag',
+            index=models.Index(fields=['tag', '-created_at', '-thread'], name='thread_tag_feed_idx'),
+        ),
+    ]
@@ -1,8 +1,53 @@
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 from django.conf import settings
 from accounts.models import CustomUser
 
+
+def add_to_counter(obj, field, delta):
+    """
+    Move ``obj.<field>`` by ``delta`` with a single UPDATE (never below zero) and
+    return the stored value, which is also set on ``obj``. Call it inside a
+    transaction so the value read back is the one this UPDATE produced.
+    """
+    rows = type(obj).objects.filter(pk=obj.pk)
+    guarded = rows.filter(**{f'{field}__gte': -delta}) if delta < 0 else rows
+    guarded.update(**{field: F(field) + delta})
+    value = rows.values_list(field, flat=True).get()
+    setattr(obj, field, value)
+    return value
+
+
+def toggle_like(obj, user):
+    """
+    Like or unlike ``obj`` (a Thread or ReplyChild) for ``user``; return True if it is now liked.
+
+    Whether the like exists is decided by deleting it or inserting it on the
+    indexed liked_by through table, and ``likeCount`` is moved with an F()
+    update, so concurrent toggles never lose a count. ``obj.likeCount`` is
+    refreshed to the stored value.
+    """
+    field = obj._meta.get_field('liked_by')
+    through = field.remote_field.through
+    link = {f'{field.m2m_field_name()}_id': obj.pk, f'{field.m2m_reverse_field_name()}_id': user.pk}
+
+    with transaction.atomic():
+        removed, _ = through.objects.filter(**link).delete()
+        if removed:
+            add_to_counter(obj, 'likeCount', -1)
+            return False
+        try:
+            with transaction.atomic():
+                through.objects.create(**link)
+        except IntegrityError:
+            # The same user's concurrent request inserted it first.
+            obj.likeCount = type(obj).objects.filter(pk=obj.pk).values_list('likeCount', flat=True).get()
+        else:
+            add_to_counter(obj, 'likeCount', 1)
+    return True
+
+
 class Thread(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True)
 
@@ -21,25 +66,89 @@ class Thread(models.Model):
         blank=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='thread_feed_idx'),
+        ]
+
+    # Tag text last mirrored into ThreadTag; None until the first save.
+    _synced_tags = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._synced_tags = instance.__dict__.get('tags')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Only re-parse when the tag text changed, so like/share/reply saves stay cheap.
+        if 'tags' in self.__dict__ and self.tags != self._synced_tags:
+            self.sync_tags()
+
+    def sync_tags(self):
+        """Mirror the comma separated ``tags`` text into Tag / ThreadTag rows."""
+        names = parse_tags(self.tags)
+        Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+        tag_ids = list(Tag.objects.filter(name__in=names).values_list('id', flat=True))
+        self.tag_links.exclude(tag_id__in=tag_ids).delete()
+        ThreadTag.objects.bulk_create(
+            [ThreadTag(thread=self, tag_id=tag_id, created_at=self.created_at) for tag_id in tag_ids],
+            ignore_conflicts=True,
+        )
+        self._synced_tags = self.tags
+
+    # The counters below move with QuerySet.update(), which sends no
+    # post_save. Cached thread responses hold no counters (show_json reads
+    # them fresh), so they are left cached.
+
     def changeLike(self,user):
-        if(user in self.liked_by.all()):
-            self.likeCount -=1
-            self.liked_by.remove(user)
-            self.save()
-            return False
-        else:
-            self.likeCount +=1
-            self.liked_by.add(user)
-            self.save()
-            return True
+        return toggle_like(self, user)
 
     def changeShare(self,isInc):
-        self.shareCount += 1 if isInc else -1
-        self.save()
+        with transaction.atomic():
+            return add_to_counter(self, 'shareCount', 1 if isInc else -1)
 
     def changeReply(self,isInc):
-        self.replyCount += 1 if isInc else -1
-        self.save()
+        with transaction.atomic():
+            return add_to_counter(self, 'replyCount', 1 if isInc else -1)
+
+TAG_MAX_LENGTH = 50
+
+
+def parse_tags(text):
+    """'Futsal, #AI,futsal' -> ['futsal', 'ai']: lowercase, no '#', no duplicates, in order."""
+    names = []
+    for raw in (text or '').split(','):
+        name = raw.strip().lstrip('#').strip().lower()[:TAG_MAX_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=TAG_MAX_LENGTH, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class ThreadTag(models.Model):
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='thread_links')
+    # Copy of thread.created_at so tag feeds and trending counts are served
+    # from this table's indexes without touching threads_thread.
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['thread', 'tag'], name='unique_thread_tag'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', '-created_at', '-thread'], name='thread_tag_feed_idx'),
+            models.Index(fields=['created_at'], name='thread_tag_created_idx'),
+        ]
+
 
 class ReplyChild(models.Model):
     thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name="replies")
@@ -56,16 +165,12 @@ class ReplyChild(models.Model):
         blank=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['thread', '-likeCount', '-created_at', '-id'], name='reply_top_idx'),
+        ]
+
     def changeLike(self,user):
-        if(user in self.liked_by.all()):
-            self.likeCount -=1
-            self.liked_by.remove(user)
-            self.save()
-            return False
-        else:
-            self.likeCount +=1
-            self.liked_by.add(user)
-            self.save()
-            return True
+        return toggle_like(self, user)
 
 
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from sosmed_PBPF08 import response_cache
+
+from .models import Thread
+
+
+@receiver(post_save, sender=Thread)
+@receiver(post_delete, sender=Thread)
+def refresh_thread_responses(sender, **kwargs):
+    response_cache.bump("threads")
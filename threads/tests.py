@@ -1,8 +1,17 @@
-from django.test import TestCase,Client
+from django.test import TestCase,Client, TransactionTestCase, override_settings
+from django.db import connection, transaction
 from accounts.models import CustomUser
-from threads.models import Thread, ReplyChild
+from threads.models import Thread, ReplyChild, Tag, ThreadTag, parse_tags
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import unittest
 
 User = get_user_model()
 
@@ -63,6 +72,26 @@ class ThreadViewsTest(TestCase):
         self.assertIsInstance(data, list)
         self.assertIn("content", data[0])
 
+    @override_settings(PRESENCE_FLUSH_INTERVAL=3600)
+    def test_replies_resolve_like_state_in_one_query(self):
+        other = User.objects.create_user(username="other", password="12345")
+        replies = [
+            ReplyChild.objects.create(thread=self.thread, content=f"Balasan {i}", user=other)
+            for i in range(50)
+        ]
+        for reply in replies[::2]:
+            reply.changeLike(self.user)
+        self.client.login(username="tester", password="12345")
+
+        # session, user, replies with their authors, liked reply ids
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("threads:get_replies_by_threadId", args=[self.thread.id]))
+        data = response.json()
+        self.assertEqual(len(data), 51)
+        liked = {item["id"] for item in data if item["isLiked"]}
+        self.assertEqual(liked, {str(reply.id) for reply in replies[::2]})
+        self.assertEqual(data[0]["thread_id"], str(self.thread.id))
+
     def test_add_reply_entry_ajax(self):
         self.client.login(username="tester", password="12345")
         response = self.client.post(
@@ -73,6 +102,9 @@ class ThreadViewsTest(TestCase):
         data = response.json()
         self.assertIn("content", data)
         self.assertEqual(data["content"], "This is a reply.")
+        self.assertEqual(data["count"], 2)
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.replyCount, 2)
 
     def test_like_thread_ajax(self):
         self.client.login(username="tester", password="12345")
@@ -95,6 +127,8 @@ class ThreadViewsTest(TestCase):
         response = self.client.get(reverse("threads:delete_reply", args=[self.reply.id]))
         self.assertEqual(response.status_code, 302)
         self.assertFalse(ReplyChild.objects.filter(id=self.reply.id).exists())
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.replyCount, 0)
 
 class ThreadModelTests(TestCase):
     def setUp(self):
@@ -144,6 +178,23 @@ class ThreadModelTests(TestCase):
         self.thread.changeReply(False)
         self.assertEqual(self.thread.replyCount, 0)
 
+    def test_counters_do_not_overwrite_other_columns(self):
+        """A stale instance bumping a counter keeps edits made since it was loaded."""
+        stale = Thread.objects.get(pk=self.thread.pk)
+        Thread.objects.filter(pk=self.thread.pk).update(content="Edited", shareCount=4)
+
+        with self.assertNumQueries(4):  # savepoint, update, select, release
+            self.assertEqual(stale.changeShare(True), 5)
+        self.assertEqual(stale.changeReply(True), 1)
+
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.content, "Edited")
+        self.assertEqual((self.thread.shareCount, self.thread.replyCount), (5, 1))
+
+    def test_counters_never_go_below_zero(self):
+        self.assertEqual(self.thread.changeReply(False), 0)
+        self.assertEqual(self.thread.changeShare(False), 0)
+
     def test_replychild_creation_and_like_toggle(self):
         """Ensure replies can be created and liked properly."""
         reply = ReplyChild.objects.create(
@@ -167,3 +218,335 @@ class ThreadModelTests(TestCase):
         self.assertFalse(result)
         self.assertEqual(reply.likeCount, 0)
         self.assertNotIn(self.user1, reply.liked_by.all())
+
+    def test_change_like_needs_no_liker_list(self):
+        """Toggling a like costs the same number of queries however many likes there are."""
+        for i in range(20):
+            self.thread.changeLike(CustomUser.objects.create(username=f"fan{i}"))
+        # delete, insert (in its own savepoint), update, select, inside one transaction
+        with self.assertNumQueries(8):
+            self.thread.changeLike(self.user2)
+        self.assertEqual(self.thread.likeCount, 21)
+        with self.assertNumQueries(5):
+            self.thread.changeLike(self.user2)
+        self.assertEqual(self.thread.likeCount, 20)
+
+
+class ConcurrentCounterTest(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Checked here rather than at import, once the test database is set up.
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            raise unittest.SkipTest("Concurrent likes need a database shared between threads; set TEST_DB_NAME.")
+        super().setUpClass()
+
+    def setUp(self):
+        self.author = CustomUser.objects.create(username="author")
+        self.thread = Thread.objects.create(user=self.author, content="Rame!", tags="")
+        self.reply = ReplyChild.objects.create(thread=self.thread, user=self.author, content="Ikut")
+
+    def _run_concurrently(self, model, pk, action, args):
+        start = threading.Barrier(len(args))
+
+        def run(arg):
+            try:
+                obj = model.objects.get(pk=pk)
+                try:
+                    start.wait(timeout=10)
+                except threading.BrokenBarrierError:
+                    pass
+                return action(obj, arg)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(args)) as pool:
+            return list(pool.map(run, args))
+
+    def _toggle_concurrently(self, model, pk, users):
+        return self._run_concurrently(model, pk, lambda obj, user: obj.changeLike(user), users)
+
+    def test_concurrent_likes_are_all_counted(self):
+        users = [CustomUser.objects.create(username=f"liker{i}") for i in range(24)]
+        for model, obj in ((Thread, self.thread), (ReplyChild, self.reply)):
+            results = self._toggle_concurrently(model, obj.pk, users)
+            self.assertTrue(all(results))
+            obj.refresh_from_db()
+            self.assertEqual(obj.likeCount, len(users))
+            self.assertEqual(obj.liked_by.count(), len(users))
+
+    def test_concurrent_double_like_by_one_user_counts_once(self):
+        user = CustomUser.objects.create(username="spammer")
+        self._toggle_concurrently(Thread, self.thread.pk, [user] * 8)
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.likeCount, self.thread.liked_by.count())
+
+    def test_concurrent_replies_and_shares_are_all_counted(self):
+        def reply(thread, i):
+            with transaction.atomic():
+                ReplyChild.objects.create(thread=thread, user=self.author, content=f"balasan {i}")
+                thread.changeReply(True)
+
+        self._run_concurrently(Thread, self.thread.pk, reply, range(16))
+        self._run_concurrently(Thread, self.thread.pk, lambda thread, _: thread.changeShare(True), range(16))
+
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.replyCount, 16)
+        self.assertEqual(self.thread.shareCount, 16)
+        self.assertEqual(self.thread.content, "Rame!")
+
+
+class ThreadFeedTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username="reader", password="12345")
+        self.threads = [
+            Thread.objects.create(user=self.user, content=f"Thread {i}", tags="feed")
+            for i in range(5)
+        ]
+        self.threads[3].changeLike(self.user)
+        self.client.login(username="reader", password="12345")
+
+    def test_feed_paginates_with_cursor(self):
+        response = self.client.get(reverse("threads:show_feed_json"), {"limit": 2})
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        self.assertEqual([t["content"] for t in page["data"]], ["Thread 4", "Thread 3"])
+        self.assertIsNotNone(page["next_cursor"])
+
+        seen = [t["id"] for t in page["data"]]
+        while page["next_cursor"]:
+            page = self.client.get(
+                reverse("threads:show_feed_json"),
+                {"limit": 2, "cursor": page["next_cursor"]},
+            ).json()
+            seen.extend(t["id"] for t in page["data"])
+
+        self.assertEqual(seen, [str(t.id) for t in reversed(self.threads)])
+
+    def test_feed_keeps_thread_shape_and_like_state(self):
+        data = self.client.get(reverse("threads:show_feed_json")).json()["data"]
+        self.assertEqual(set(data[0]), {
+            "user", "id", "content", "tags", "image", "likeCount",
+            "shareCount", "replyCount", "created_at", "isLiked",
+        })
+        liked = {t["content"]: t["isLiked"] for t in data}
+        self.assertTrue(liked["Thread 3"])
+        self.assertFalse(liked["Thread 4"])
+
+    @override_settings(PRESENCE_FLUSH_INTERVAL=3600)
+    def test_feed_query_count_is_constant(self):
+        for i in range(10):
+            thread = Thread.objects.create(user=self.user, content=f"Extra {i}", tags="feed")
+            thread.changeLike(self.user)
+        # session, user, threads page, liked ids
+        with self.assertNumQueries(4):
+            self.client.get(reverse("threads:show_feed_json"), {"limit": 15})
+
+    def test_feed_rejects_invalid_cursor(self):
+        response = self.client.get(reverse("threads:show_feed_json"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PRESENCE_FLUSH_INTERVAL=3600)
+class ThreadResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username="alice", password="12345")
+        self.bob = User.objects.create_user(username="bob", password="12345")
+        self.thread = Thread.objects.create(user=self.alice, content="Hello World", tags="futsal")
+        self.url = reverse("threads:show_json")
+
+    def test_thread_list_is_cached_and_like_state_is_per_user(self):
+        self.thread.changeLike(self.alice)
+        self.client.login(username="alice", password="12345")
+        self.client.get(self.url)
+        # session, user, counters, liked thread ids; the thread list comes from the cache
+        with self.assertNumQueries(4):
+            data = self.client.get(self.url).json()
+        self.assertTrue(data[0]["isLiked"])
+
+        self.client.login(username="bob", password="12345")
+        data = self.client.get(self.url).json()
+        self.assertFalse(data[0]["isLiked"])
+        self.assertEqual(data[0]["likeCount"], 1)
+
+    def test_counters_are_live_and_content_changes_invalidate(self):
+        self.client.get(self.url)
+        self.client.get(self.url, {"tag": "futsal"})
+        self.thread.changeLike(self.bob)
+        self.thread.changeShare(True)
+        self.thread.changeReply(True)
+        # Only the counters; counter changes keep the cached list.
+        with self.assertNumQueries(1):
+            data = self.client.get(self.url, {"tag": "futsal"}).json()
+        self.assertEqual([data[0][field] for field in ("likeCount", "shareCount", "replyCount")], [1, 1, 1])
+        data = self.client.get(self.url).json()
+        self.assertEqual((data[0]["likeCount"], data[0]["shareCount"]), (1, 1))
+
+        self.thread.content = "Edited"
+        self.thread.save()
+        self.assertEqual(self.client.get(self.url).json()[0]["content"], "Edited")
+
+        Thread.objects.create(user=self.bob, content="Second", tags="basket")
+        self.assertEqual(len(self.client.get(self.url).json()), 2)
+
+    def test_tag_filter_has_its_own_entry(self):
+        Thread.objects.create(user=self.bob, content="Second", tags="basket")
+        self.assertEqual(len(self.client.get(self.url).json()), 2)
+        data = self.client.get(self.url, {"tag": "#Futsal"}).json()
+        self.assertEqual([item["content"] for item in data], ["Hello World"])
+        self.assertEqual(self.client.get(self.url, {"tag": ""}).json(), [])
+
+
+class ReplyPageTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="12345")
+        self.thread = Thread.objects.create(user=self.user, content="Hello World")
+        now = timezone.now()
+        self.replies = []
+        for i in range(25):
+            reply = ReplyChild.objects.create(thread=self.thread, content=f"Balasan {i}", user=self.user)
+            self.replies.append(reply)
+        # A few likes and some equal timestamps so every part of the key is used.
+        ReplyChild.objects.filter(pk__in=[r.pk for r in self.replies[:5]]).update(likeCount=3)
+        ReplyChild.objects.filter(pk__in=[r.pk for r in self.replies[5:10]]).update(likeCount=1)
+        ReplyChild.objects.filter(pk__in=[r.pk for r in self.replies[10:]]).update(created_at=now)
+        self.client.login(username="tester", password="12345")
+        self.url = reverse("threads:get_replies_page", args=[self.thread.id])
+
+    def test_first_page_is_top_replies(self):
+        response = self.client.get(self.url)
+        body = response.json()
+        self.assertEqual(len(body["data"]), 10)
+        self.assertIsNotNone(body["next_cursor"])
+        self.assertEqual(
+            {item["id"] for item in body["data"][:5]},
+            {str(r.id) for r in self.replies[:5]},
+        )
+
+    def test_load_more_walks_every_reply_once(self):
+        expected = list(
+            ReplyChild.objects.filter(thread=self.thread)
+            .order_by("-likeCount", "-created_at", "-id")
+            .values_list("id", flat=True)
+        )
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 7}
+            if cursor:
+                params["cursor"] = cursor
+            body = self.client.get(self.url, params).json()
+            seen.extend(item["id"] for item in body["data"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, [str(pk) for pk in expected])
+
+    @override_settings(PRESENCE_FLUSH_INTERVAL=3600)
+    def test_page_query_count_is_constant(self):
+        cursor = self.client.get(self.url).json()["next_cursor"]
+        # session, user, one page of replies with their authors, liked reply ids
+        with self.assertNumQueries(4):
+            self.client.get(self.url, {"cursor": cursor})
+
+    def test_rejects_invalid_cursor_and_limit(self):
+        response = self.client.get(self.url, {"cursor": "bukan-cursor"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("cursor", response.json()["errors"])
+        response = self.client.get(self.url, {"limit": "banyak"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("limit", response.json()["errors"])
+
+
+class ThreadTagTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username="tagger", password="12345")
+        self.client.login(username="tagger", password="12345")
+
+    def test_tags_are_parsed_on_write(self):
+        thread = Thread.objects.create(user=self.user, content="Main bareng", tags=" Futsal, #AI,futsal,, ")
+        self.assertEqual(parse_tags(thread.tags), ["futsal", "ai"])
+        self.assertEqual(
+            sorted(thread.tag_links.values_list("tag__name", flat=True)), ["ai", "futsal"]
+        )
+
+        thread.tags = "ai,basket"
+        thread.save()
+        self.assertEqual(
+            sorted(thread.tag_links.values_list("tag__name", flat=True)), ["ai", "basket"]
+        )
+        self.assertEqual(Tag.objects.count(), 3)
+
+    def test_saves_with_unchanged_tags_do_not_touch_tags(self):
+        thread = Thread.objects.create(user=self.user, content="x", tags="futsal")
+        thread = Thread.objects.get(pk=thread.pk)
+        thread.content = "y"
+        with self.assertNumQueries(1):
+            thread.save()
+
+    def test_feed_filters_by_tag(self):
+        futsal = Thread.objects.create(user=self.user, content="a", tags="futsal,malam")
+        Thread.objects.create(user=self.user, content="b", tags="basket")
+        also_futsal = Thread.objects.create(user=self.user, content="c", tags="#Futsal")
+
+        for url in (reverse("threads:show_feed_json"), reverse("threads:show_json")):
+            response = self.client.get(url, {"tag": "futsal"})
+            data = response.json()
+            data = data["data"] if isinstance(data, dict) else data
+            self.assertEqual([t["id"] for t in data], [str(also_futsal.id), str(futsal.id)])
+
+        data = self.client.get(reverse("threads:show_feed_json"), {"tag": "tenis"}).json()["data"]
+        self.assertEqual(data, [])
+
+    def test_tag_feed_pages_through_thread_tags(self):
+        created_at = timezone.now()
+        tagged = [Thread.objects.create(user=self.user, content=str(i), tags="futsal") for i in range(5)]
+        Thread.objects.create(user=self.user, content="other", tags="basket")
+        # Equal timestamps, so the cursor has to fall back to the thread id.
+        Thread.objects.filter(pk__in=[t.pk for t in tagged]).update(created_at=created_at)
+        ThreadTag.objects.filter(thread__in=tagged).update(created_at=created_at)
+
+        seen, cursor = [], None
+        while True:
+            params = {"tag": "futsal", "limit": 2, **({"cursor": cursor} if cursor else {})}
+            with self.assertNumQueries(4):
+                page = self.client.get(reverse("threads:show_feed_json"), params).json()
+            seen += [t["id"] for t in page["data"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(seen, sorted((str(t.id) for t in tagged), reverse=True))
+
+    def test_trending_tags_use_time_window(self):
+        old = Thread.objects.create(user=self.user, content="lama", tags="basket")
+        ThreadTag.objects.filter(thread=old).update(created_at=timezone.now() - timedelta(days=10))
+        Thread.objects.create(user=self.user, content="a", tags="futsal,ai")
+        Thread.objects.create(user=self.user, content="b", tags="futsal")
+
+        response = self.client.get(reverse("threads:trending_tags_json"))
+        self.assertEqual(response.json()["data"], [
+            {"tag": "futsal", "count": 2},
+            {"tag": "ai", "count": 1},
+        ])
+
+        data = self.client.get(reverse("threads:trending_tags_json"), {"hours": 24 * 30}).json()["data"]
+        self.assertIn({"tag": "basket", "count": 1}, data)
+
+    def test_backfill_command_links_existing_threads(self):
+        thread = Thread.objects.create(user=self.user, content="x", tags="futsal")
+        Thread.objects.filter(pk=thread.pk).update(tags="futsal,ai")
+        ThreadTag.objects.all().delete()
+        other = Thread.objects.create(user=self.user, content="y", tags="ai")
+        ThreadTag.objects.filter(thread=other).delete()
+
+        out = StringIO()
+        call_command("backfill_tags", "--batch-size", "1", stdout=out)
+        self.assertIn("Backfilled 2 thread(s), 3 new thread-tag link(s).", out.getvalue())
+        self.assertEqual(
+            sorted(ThreadTag.objects.filter(thread=thread).values_list("tag__name", flat=True)),
+            ["ai", "futsal"],
+        )
+
+        call_command("backfill_tags", stdout=out)
+        self.assertEqual(ThreadTag.objects.count(), 3)
@@ -3,7 +3,7 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.http import Http404, HttpResponse,HttpResponseRedirect
 
 from accounts.models import CustomUser
-from .models import Thread,ReplyChild
+from .models import Thread,ReplyChild,ThreadTag,parse_tags
 
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
@@ -12,6 +12,15 @@ from django.views.decorators.http import require_POST
 from django.urls import reverse
 
 from django.templatetags.static import static
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+import uuid
+from datetime import timedelta
+from urllib.parse import quote
+
+from sosmed_PBPF08 import pagination, response_cache
 
 
 
@@ -19,31 +28,201 @@ from django.templatetags.static import static
 def show_main(request):
     return render(request, "main_threads.html")
 
+FEED_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 50
+REPLY_PAGE_SIZE = 10
+REPLY_MAX_PAGE_SIZE = 50
+TRENDING_WINDOW_HOURS = 24 * 7
+TRENDING_MAX_WINDOW_HOURS = 24 * 30
+TRENDING_LIMIT = 5
+TRENDING_MAX_LIMIT = 20
+COUNTER_FIELDS = ('likeCount', 'shareCount', 'replyCount')
+# Served by reply_top_idx.
+REPLY_ORDER = ('-likeCount', '-created_at', '-id')
+
+
+def _profile_picture_url(user):
+    if getattr(user, 'profile_picture', None) and hasattr(user.profile_picture, 'url'):
+        return user.profile_picture.url
+    return static('accounts/img/default.png')
+
+
+def _liked_ids(model, user, ids):
+    """
+    Return the subset of ``ids`` (Thread or ReplyChild pks) liked by ``user``,
+    from one query on the ``liked_by`` through table.
+    """
+    if not user.is_authenticated or not ids:
+        return set()
+    field = model._meta.get_field('liked_by')
+    object_column = f'{field.m2m_field_name()}_id'
+    return set(
+        field.remote_field.through.objects
+        .filter(**{f'{field.m2m_reverse_field_name()}_id': user.pk, f'{object_column}__in': ids})
+        .values_list(object_column, flat=True)
+    )
+
+
+def _serialize_thread(thread, is_liked):
+    return {
+        'user':{
+            'username': getattr(thread.user, 'username', 'Anonymous'),
+            'profile_picture': _profile_picture_url(thread.user),
+        },
+        'id': str(thread.id),
+        'content' :thread.content,
+        'tags' : thread.tags,
+        'image' : thread.image,
+        'likeCount' : thread.likeCount,
+        'shareCount' : thread.shareCount,
+        'replyCount' : thread.replyCount,
+        'created_at' : thread.created_at,
+        "isLiked": is_liked
+    }
+
+
+def _serialize_threads(threads, user):
+    liked_ids = _liked_ids(Thread, user, [thread.id for thread in threads])
+    return [_serialize_thread(thread, thread.id in liked_ids) for thread in threads]
+
+
+def _serialize_reply(reply, is_liked):
+    return {
+        'user':{
+            'username': getattr(reply.user, 'username', 'Anonymous'),
+            'profile_picture': _profile_picture_url(reply.user),
+        },
+        'id': str(reply.id),
+        'thread_id': str(reply.thread_id),
+        'content': reply.content,
+        'created_at': reply.created_at.isoformat(),
+        'likeCount': reply.likeCount,
+        "isLiked": is_liked
+    }
+
+
+def _serialize_replies(replies, user):
+    liked_ids = _liked_ids(ReplyChild, user, [reply.id for reply in replies])
+    return [_serialize_reply(reply, reply.id in liked_ids) for reply in replies]
+
+
+def _tag_links(request):
+    """
+    ThreadTag rows for ``?tag=``, newest first, with their threads and authors
+    joined; None when there is no ``?tag=``. Tag feeds are filtered, ordered and
+    paged on ThreadTag's own copy of ``created_at`` so thread_tag_feed_idx
+    serves them. Unknown or empty tags match nothing.
+    """
+    tag = request.GET.get('tag')
+    if tag is None:
+        return None
+    links = ThreadTag.objects.select_related('thread__user').order_by('-created_at', '-thread_id')
+    names = parse_tags(tag)
+    if not names:
+        return links.none()
+    return links.filter(tag__name=names[0])
+
+
+def _with_like_state(items, model, user):
+    """Copies of serialized ``items`` with ``isLiked`` set for ``user``."""
+    liked_ids = {str(pk) for pk in _liked_ids(model, user, [item['id'] for item in items])}
+    return [{**item, 'isLiked': item['id'] in liked_ids} for item in items]
+
+
+def _with_live_counters(items, request):
+    """
+    Copies of serialized ``items`` with likeCount, shareCount and replyCount
+    read from the database, in one query over the same threads ``?tag=`` picks.
+    """
+    threads = Thread.objects.all()
+    links = _tag_links(request)
+    if links is not None:
+        threads = threads.filter(pk__in=links.values('thread_id'))
+    counters = {
+        str(pk): dict(zip(COUNTER_FIELDS, values))
+        for pk, *values in threads.values_list('id', *COUNTER_FIELDS)
+    }
+    return [{**item, **counters.get(item['id'], {})} for item in items]
+
+
 def show_json(request):
-    thread_list = Thread.objects.all().order_by('-created_at')
-    data = [
-        {
-            'user':{
-                'username': getattr(thread.user, 'username', 'Anonymous'),
-                'profile_picture': (
-                    thread.user.profile_picture.url
-                    if getattr(thread.user, 'profile_picture', None) and hasattr(thread.user.profile_picture, 'url')
-                    else static('accounts/img/default.png')
-                )
-            },
-            'id': str(thread.id),
-            'content' :thread.content,
-            'tags' : thread.tags,
-            'image' : thread.image,
-            'likeCount' : thread.likeCount,
-            'shareCount' : thread.shareCount,
-            'replyCount' : thread.replyCount,
-            'created_at' : thread.created_at,
-            "isLiked": request.user in thread.liked_by.all()
-        }
-        for thread in thread_list
-    ]
-    return JsonResponse(data, safe=False)
+    # The thread list is the same for everyone and is cached until a thread is
+    # created, edited or deleted. Counters move on every like, share and reply,
+    # so they are read fresh on each request, like the viewer's likes.
+    tag = request.GET.get('tag')
+    cache_key = 'threads:show_json' if tag is None else f"threads:show_json:tag:{quote(''.join(parse_tags(tag)[:1]))}"
+
+    def build():
+        links = _tag_links(request)
+        if links is None:
+            thread_list = Thread.objects.select_related('user').order_by('-created_at')
+        else:
+            thread_list = (link.thread for link in links)
+        return [_serialize_thread(thread, False) for thread in thread_list]
+
+    data = _with_live_counters(response_cache.cached(['threads'], cache_key, build), request)
+    return JsonResponse(_with_like_state(data, Thread, request.user), safe=False)
+
+def show_feed_json(request):
+    """
+    Keyset-paginated thread feed, newest first.
+
+    ``?cursor=`` is the ``next_cursor`` of the previous page, ``?limit=`` the
+    page size (capped at FEED_MAX_PAGE_SIZE) and ``?tag=`` limits the feed to
+    one hashtag.
+    """
+    try:
+        limit = int(request.GET.get('limit', FEED_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({"errors": {"limit": ["Limit must be an integer."]}}, status=400)
+    limit = min(max(limit, 1), FEED_MAX_PAGE_SIZE)
+
+    # A tag feed pages ThreadTag rows, whose (created_at, thread_id) equal
+    # the thread's (created_at, id), so the cursor is the same either way.
+    links = _tag_links(request)
+    if links is None:
+        rows, id_field = Thread.objects.select_related('user').order_by('-created_at', '-id'), 'id'
+    else:
+        rows, id_field = links, 'thread_id'
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        position = pagination.decode_cursor(cursor, pagination.timestamp, uuid.UUID)
+        if position is None:
+            return JsonResponse({"errors": {"cursor": ["Invalid cursor."]}}, status=400)
+        rows = rows.filter(pagination.after(('-created_at', f'-{id_field}'), position))
+
+    rows, next_cursor = pagination.page(rows, limit, lambda row: (row.created_at, getattr(row, id_field)))
+    threads = rows if links is None else [link.thread for link in rows]
+
+    return JsonResponse({
+        "data": _serialize_threads(threads, request.user),
+        "next_cursor": next_cursor,
+    })
+
+def trending_tags_json(request):
+    """
+    Most used hashtags over the last ``?hours=`` (default one week), top
+    ``?limit=`` first. Counted from the ThreadTag created_at index.
+    """
+    try:
+        hours = int(request.GET.get('hours', TRENDING_WINDOW_HOURS))
+        limit = int(request.GET.get('limit', TRENDING_LIMIT))
+    except ValueError:
+        return JsonResponse({"errors": {"__all__": ["hours and limit must be integers."]}}, status=400)
+    hours = min(max(hours, 1), TRENDING_MAX_WINDOW_HOURS)
+    limit = min(max(limit, 1), TRENDING_MAX_LIMIT)
+
+    since = timezone.now() - timedelta(hours=hours)
+    trending = (
+        ThreadTag.objects.filter(created_at__gte=since)
+        .values('tag__name')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'tag__name')[:limit]
+    )
+    return JsonResponse({
+        "data": [{"tag": row['tag__name'], "count": row['count']} for row in trending],
+    })
 
 @login_required
 @csrf_exempt
@@ -70,44 +249,64 @@ def delete_thread(request, thread_id):
 
 
 def get_replies_by_threadId(request, threadId):
-    replies = ReplyChild.objects.filter(thread=threadId).order_by('-likeCount')
+    """All replies of a thread, most liked first, as a bare list. The reply drawer uses get_replies_page."""
+    replies = (
+        ReplyChild.objects.filter(thread=threadId)
+        .select_related('user')
+        .order_by(*REPLY_ORDER)
+    )
+    data = _serialize_replies(list(replies), request.user)
+    return JsonResponse(data, safe=False)
 
-    data = [
-        {
-            'user':{
-                'username': getattr(reply.user, 'username', 'Anonymous'),
-                'profile_picture': (
-                    reply.user.profile_picture.url
-                    if getattr(reply.user, 'profile_picture', None) and hasattr(reply.user.profile_picture, 'url')
-                    else static('accounts/img/default.png')
-                )
-            },
-            'id': str(reply.id),
-            'thread_id': str(reply.thread.id),
-            'content': reply.content,
-            'created_at': reply.created_at.isoformat(),
-            'likeCount': reply.likeCount,
-            "isLiked": request.user in reply.liked_by.all()
 
-        }
-        for reply in replies
-    ]
+def get_replies_page(request, threadId):
+    """
+    Replies of a thread, most liked first, one page at a time.
 
-    return JsonResponse(data, safe=False)
+    The first request returns the top ``?limit=`` replies (REPLY_PAGE_SIZE by
+    default, capped at REPLY_MAX_PAGE_SIZE); pass ``next_cursor`` back as
+    ``?cursor=`` to load more. Pages are read from reply_top_idx, so opening
+    the drawer costs the same however many replies a thread has.
+    """
+    try:
+        limit = int(request.GET.get('limit', REPLY_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({"errors": {"limit": ["Limit must be an integer."]}}, status=400)
+    limit = min(max(limit, 1), REPLY_MAX_PAGE_SIZE)
+
+    replies = ReplyChild.objects.filter(thread=threadId).select_related('user').order_by(*REPLY_ORDER)
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        position = pagination.decode_cursor(cursor, int, pagination.timestamp, uuid.UUID)
+        if position is None or position[0] < 0:
+            return JsonResponse({"errors": {"cursor": ["Invalid cursor."]}}, status=400)
+        replies = replies.filter(pagination.after(REPLY_ORDER, position))
+
+    replies, next_cursor = pagination.page(
+        replies, limit, lambda reply: (reply.likeCount, reply.created_at, reply.id)
+    )
+
+    return JsonResponse({
+        "data": _serialize_replies(replies, request.user),
+        "next_cursor": next_cursor,
+    })
 
 @login_required
 @csrf_exempt
 @require_POST
 def add_reply_entry_ajax(request, threadId):
     content = request.POST.get("content", "").strip()
-    parent_thread = Thread.objects.get(pk=threadId)
-    parent_thread.changeReply(True)
+    parent_thread = get_object_or_404(Thread, pk=threadId)
 
-    reply = ReplyChild.objects.create(
-        thread=parent_thread,
-        content=content,
-        user = request.user
-    )
+    # The reply and its count land together or not at all.
+    with transaction.atomic():
+        reply = ReplyChild.objects.create(
+            thread=parent_thread,
+            content=content,
+            user = request.user
+        )
+        parent_thread.changeReply(True)
 
     data = {
         "id": reply.id,
@@ -118,11 +317,7 @@ def add_reply_entry_ajax(request, threadId):
         "count":parent_thread.replyCount,
         'user':{
                 'username': getattr(reply.user, 'username', 'Anonymous'),
-                'profile_picture': (
-                    reply.user.profile_picture.url
-                    if getattr(reply.user, 'profile_picture', None) and hasattr(reply.user.profile_picture, 'url')
-                    else static('accounts/img/default.png')
-                )
+                'profile_picture': _profile_picture_url(reply.user),
             },
     }
 
@@ -157,8 +352,9 @@ def like_reply_ajax(request, replyId):
 
 
 def delete_reply(request, reply_id):
-    reply = get_object_or_404(ReplyChild, pk=reply_id)
-    reply.thread.changeReply(False)
-    reply.delete()
+    reply = get_object_or_404(ReplyChild.objects.select_related('thread'), pk=reply_id)
+    with transaction.atomic():
+        reply.delete()
+        reply.thread.changeReply(False)
     return HttpResponseRedirect(reverse('threads:show_main'))
 